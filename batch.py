@@ -0,0 +1,143 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from typing import Iterator
+
+import puzzleloader
+import search
+from budget import Budget
+from cache import SolutionCache
+from costmodel import load_timings, order_by_cost
+from main import SearchAlgorithm, result_status, run_search
+from state import Restriction, State
+
+cache = None  # The solution cache of this worker process, if any
+limits = (None, None)  # The time limit and node limit of every puzzle of this worker process
+
+
+def init_worker(cache_path: str = None, time_limit: float = None, node_limit: int = None) -> None:
+    """
+    Initializes a worker process, every worker owns its own transposition table and connection to the solution cache
+    :param cache_path: The filename of the solution cache, default is no cache
+    :param time_limit: The maximum number of seconds to search each puzzle, default is no limit
+    :param node_limit: The maximum number of nodes to search for each puzzle, default is no limit
+    """
+    global cache, limits
+    search.transposition_table.clear()
+    cache = SolutionCache(cache_path) if cache_path is not None else None
+    limits = (time_limit, node_limit)
+
+
+def solve_puzzle(task: tuple) -> dict:
+    """
+    Solves a single puzzle, this runs inside a worker process
+    :param task: A tuple of the puzzle filename, the puzzle index, the puzzle, the search algorithm and the mate move
+    restriction to use
+    :return: A dictionary of the result
+    """
+    filename, index, puzzle, search_type, restriction = task
+    initial_state = State(puzzle['player'], puzzle['position'], puzzle['mate'])
+
+    start = time.perf_counter()
+    budget = Budget(*limits) if limits != (None, None) else None
+    terminal, expanded = run_search(initial_state, search_type, restriction, cache=cache, budget=budget)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'file': filename,
+        'index': index,
+        'position': puzzle['position'],
+        'mate': puzzle['mate'],
+        'path': terminal.path(),
+        'utility': terminal.state.utility(),
+        'status': result_status(terminal, search.stats),
+        'expanded': expanded,
+        'skipped': sum(search.stats.skipped.values()),
+        'time': elapsed,
+        'stats': search.stats.summary(),
+        'solution': puzzle['solution'],
+    }
+
+
+def solve_puzzle_files(filenames: list, search_type: SearchAlgorithm, workers: int = None,
+                       restriction: Restriction = Restriction.NONE, cache_path: str = None, start: int = 0,
+                       stop: int = None, shard: int = 0, shards: int = 1, time_limit: float = None,
+                       node_limit: int = None, longest_first: bool = False, history: list = None) -> Iterator[dict]:
+    """
+    Solves every puzzle of the puzzle files on a pool of worker processes. The puzzles are read lazily so solving
+    starts right away, or with longest_first they are all read and ordered by their estimated cost first. Either way
+    every idle worker takes the next puzzle, so no worker waits on the puzzles of another one.
+    :param filenames: The puzzle filenames
+    :param search_type: The search algorithm to use
+    :param workers: The number of worker processes, default is the number of CPUs
+    :param restriction: The mate move restriction to use
+    :param cache_path: The filename of a solution cache, solved puzzles are looked up in it and new ones stored
+    :param start: The index of the first puzzle to solve in every file
+    :param stop: The index after the last puzzle to solve in every file, default is the end of the file
+    :param shard: The shard of every file to solve, to split the files across several runs
+    :param shards: The number of shards the files are split into
+    :param time_limit: The maximum number of seconds to search each puzzle, default is no limit
+    :param node_limit: The maximum number of nodes to search for each puzzle, default is no limit
+    :param longest_first: Whether to solve the puzzles in descending order of estimated cost, to shorten the wall
+    time of the run
+    :param history: The files of earlier batch runs whose solve times replace the estimates of their puzzles
+    :return: An iterator of the results in the order the puzzles are solved
+    """
+    tasks = (
+        (filename, index, puzzle, search_type, restriction)
+        for filename in filenames
+        for index, puzzle in puzzleloader.iter_puzzles(filename, start=start, stop=stop, shard=shard, shards=shards)
+    )
+    if longest_first:
+        tasks = order_by_cost(list(tasks), load_timings(history or []))
+
+    if workers == 1:  # No need for a pool when there is a single worker
+        init_worker(cache_path, time_limit, node_limit)
+        yield from map(solve_puzzle, tasks)
+        return
+
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(cache_path, time_limit, node_limit)) as pool:
+        yield from pool.imap_unordered(solve_puzzle, tasks, chunksize=1)  # One puzzle at a time to every idle worker
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Solve whole puzzle files in parallel")
+    parser.add_argument('files', nargs='+', help="The puzzle files to solve")
+    parser.add_argument('-a', '--algorithm', default=SearchAlgorithm.TRANSPOSITION.name,
+                        choices=[algorithm.name for algorithm in SearchAlgorithm], help="The search algorithm to use")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="The number of worker processes, default is the number of CPUs")
+    parser.add_argument('-r', '--restriction', default=Restriction.NONE.name,
+                        choices=[restriction.name for restriction in Restriction],
+                        help="The mate move restriction to use")
+    parser.add_argument('-c', '--cache', default=None, help="A solution cache file to reuse earlier solutions")
+    parser.add_argument('--start', type=int, default=0, help="The index of the first puzzle of every file")
+    parser.add_argument('--stop', type=int, default=None, help="The index after the last puzzle of every file")
+    parser.add_argument('--shard', default='0/1',
+                        help="The shard to solve as INDEX/COUNT, every COUNT-th puzzle starting from INDEX")
+    parser.add_argument('-t', '--time-limit', type=float, default=None, help="The maximum seconds for each puzzle")
+    parser.add_argument('-n', '--node-limit', type=int, default=None, help="The maximum nodes for each puzzle")
+    parser.add_argument('-o', '--order', default=None, choices=['cost', 'file'],
+                        help="Solve the puzzles lazily in file order, or longest first by their estimated cost after "
+                             "reading them all, default is cost with --history and file otherwise")
+    parser.add_argument('--history', nargs='+', default=None,
+                        help="Outputs of earlier batch runs, their solve times replace the estimated costs")
+    args = parser.parse_args()
+    shard, shards = (int(number) for number in args.shard.split('/'))
+    longest_first = args.order == 'cost' or (args.order is None and args.history is not None)
+
+    start = time.perf_counter()
+    solved = 0
+    for result in solve_puzzle_files(args.files, SearchAlgorithm[args.algorithm], args.workers,
+                                     Restriction[args.restriction], args.cache, args.start, args.stop, shard, shards,
+                                     args.time_limit, args.node_limit, longest_first, args.history):
+        print(json.dumps(result), flush=True)  # Stream one JSON line per puzzle
+        solved += 1
+
+    print("Solved", solved, "puzzles in", round(time.perf_counter() - start, 3), "seconds", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
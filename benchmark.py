@@ -0,0 +1,201 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+import puzzleloader
+from batch import init_worker, solve_puzzle
+from main import SearchAlgorithm
+from state import Restriction
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+PUZZLE_SETS = ['puzzles', 'puzzles_full']
+MATES = [2, 3, 4]
+
+
+def run_group(filename: str, search_type: SearchAlgorithm, restriction: Restriction, limit: int = None) -> dict:
+    """
+    Solves the puzzles of one puzzle file with one search algorithm, this runs inside a fresh process so the peak
+    memory belongs to this group only
+    :param filename: The puzzle filename
+    :param search_type: The search algorithm to use
+    :param restriction: The mate move restriction to use
+    :param limit: The number of puzzles to solve from the start of the file, default is every puzzle
+    :return: A dictionary of the results of every puzzle and the peak memory in kilobytes
+    """
+    init_worker()
+    results = []
+    for index, puzzle in puzzleloader.iter_puzzles(filename, stop=limit):
+        result = solve_puzzle((filename, index, puzzle, search_type, restriction))
+        solution = puzzleloader.solution_moves(puzzle)
+        results.append({
+            'index': index,
+            'expanded': result['expanded'],
+            'time': result['time'],
+            'utility': result['utility'],
+            'match': result['path'] == solution,
+            'key_match': result['path'][:1] == solution[:1],
+        })
+
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+    return {'puzzles': results, 'peak_memory': peak_memory}
+
+
+def summarize(group: dict) -> dict:
+    """
+    Sums up the results of the puzzles of a group
+    :param group: The group returned by run_group
+    :return: A dictionary of the totals of the group
+    """
+    puzzles = group['puzzles']
+    expanded = sum(puzzle['expanded'] for puzzle in puzzles)
+    wall_time = sum(puzzle['time'] for puzzle in puzzles)
+    return {
+        'puzzles': len(puzzles),
+        'solved': sum(puzzle['utility'] == 1 for puzzle in puzzles),
+        'matches': sum(puzzle['match'] for puzzle in puzzles),
+        'key_matches': sum(puzzle['key_match'] for puzzle in puzzles),
+        'expanded': expanded,
+        'time': wall_time,
+        'nodes_per_second': expanded / wall_time if wall_time else 0.0,
+        'peak_memory': group['peak_memory'],
+    }
+
+
+def run_benchmark(sets: list, mates: list, algorithms: list, restriction: Restriction = Restriction.NONE,
+                  limit: int = None) -> dict:
+    """
+    Runs every search algorithm over every puzzle file of the puzzle sets
+    :param sets: The puzzle set folders
+    :param mates: The checkmate depths of the puzzle files
+    :param algorithms: The search algorithms
+    :param restriction: The mate move restriction to use
+    :param limit: The number of puzzles to solve from the start of every file, default is every puzzle
+    :return: A dictionary of the environment and the results of every group
+    """
+    groups = []
+    for puzzle_set in sets:
+        for mate in mates:
+            filename = os.path.join(puzzle_set, 'mate' + str(mate) + '.txt')
+            if not os.path.exists(filename):
+                continue
+            for search_type in algorithms:
+                with multiprocessing.Pool(1) as pool:  # A fresh process for every group
+                    group = pool.apply(run_group, (filename, search_type, restriction, limit))
+                groups.append({
+                    'set': puzzle_set,
+                    'mate': mate,
+                    'algorithm': search_type.name,
+                    'restriction': restriction.name,
+                    'summary': summarize(group),
+                    'puzzles': group['puzzles'],
+                })
+                print(group_name(groups[-1]), groups[-1]['summary'], file=sys.stderr, flush=True)
+
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'limit': limit,
+        'groups': groups,
+    }
+
+
+def group_name(group: dict) -> str:
+    """
+    Gets the name of a group of a benchmark, a group is compared with the group of the same name in a baseline
+    :param group: A group of a benchmark
+    :return: The name of the group
+    """
+    return group['set'] + '/mate' + str(group['mate']) + ' ' + group['algorithm'] + ' ' + group['restriction']
+
+
+def compare(baseline: dict, results: dict, tolerance: float = 0.1, time_tolerance: float = 0.25) -> list:
+    """
+    Compares benchmark results with a baseline
+    :param baseline: The baseline benchmark
+    :param results: The new benchmark
+    :param tolerance: The allowed relative increase of expanded states and peak memory
+    :param time_tolerance: The allowed relative increase of wall time, which is noisier
+    :return: A list of the regressions, empty if there is none
+    """
+    regressions = []
+    baseline_groups = {group_name(group): group['summary'] for group in baseline['groups']}
+    for group in results['groups']:
+        name = group_name(group)
+        if name not in baseline_groups:
+            continue
+        old, new = baseline_groups[name], group['summary']
+        if old['puzzles'] != new['puzzles']:  # Not the same puzzles, nothing to compare
+            continue
+
+        for key in ['solved', 'matches']:
+            if new[key] < old[key]:
+                regressions.append(name + ': ' + key + ' dropped from ' + str(old[key]) + ' to ' + str(new[key]))
+        for key, allowed in [('expanded', tolerance), ('time', time_tolerance), ('peak_memory', tolerance)]:
+            if old[key] and new[key] and new[key] > old[key] * (1 + allowed):
+                regressions.append(name + ': ' + key + ' rose from ' + str(round(old[key], 3)) + ' to ' +
+                                   str(round(new[key], 3)) + ' (+' + str(round(100 * (new[key] / old[key] - 1))) +
+                                   '%)')
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the search algorithms over the puzzle sets")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run the benchmark")
+    run.add_argument('-o', '--output', default='benchmark.json', help="The file to write the results to")
+    run.add_argument('-s', '--sets', nargs='+', default=PUZZLE_SETS, help="The puzzle set folders")
+    run.add_argument('-m', '--mates', nargs='+', type=int, default=MATES, help="The checkmate depths")
+    run.add_argument('-a', '--algorithms', nargs='+', default=[algorithm.name for algorithm in SearchAlgorithm],
+                     choices=[algorithm.name for algorithm in SearchAlgorithm], help="The search algorithms")
+    run.add_argument('-r', '--restriction', default=Restriction.NONE.name,
+                     choices=[restriction.name for restriction in Restriction], help="The mate move restriction")
+    run.add_argument('-n', '--limit', type=int, default=None, help="The number of puzzles of every file")
+    run.add_argument('-b', '--baseline', default=None, help="A baseline to compare the results with")
+
+    check = commands.add_parser('compare', help="Compare benchmark results with a baseline")
+    check.add_argument('baseline', help="The baseline results")
+    check.add_argument('results', help="The new results")
+
+    for command in [run, check]:
+        command.add_argument('-t', '--tolerance', type=float, default=0.1,
+                             help="The allowed relative increase of expanded states and peak memory")
+        command.add_argument('--time-tolerance', type=float, default=0.25,
+                             help="The allowed relative increase of wall time")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run_benchmark(args.sets, args.mates, [SearchAlgorithm[name] for name in args.algorithms],
+                                Restriction[args.restriction], args.limit)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+        baseline_file = args.baseline
+    else:
+        with open(args.results) as f:
+            results = json.load(f)
+        baseline_file = args.baseline
+
+    if baseline_file is None:
+        return
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, results, args.tolerance, args.time_tolerance)
+    for regression in regressions:
+        print("REGRESSION", regression)
+    if regressions:
+        sys.exit(1)
+    print("No regressions against", baseline_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import threading
+import time
+
+
+class SearchAborted(Exception):
+    """
+    Raised inside a search when its budget runs out or it is cancelled
+    """
+
+    def __init__(self, reason: str):
+        """
+        Initialises the exception
+        :param reason: Why the search was aborted, 'time', 'nodes' or 'cancelled'
+        """
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Budget:
+    """
+    Limits of a search run on wall time and visited nodes, with a cancel token. A budget is registered as an enter
+    callback of the search statistics, so it is checked at every node the search enters.
+    """
+
+    def __init__(self, time_limit: float = None, node_limit: int = None):
+        """
+        Initialises a budget
+        :param time_limit: The maximum number of seconds of the search, default is no limit
+        :param node_limit: The maximum number of nodes the search may visit, default is no limit
+        """
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.deadline = None
+        self._cancelled = threading.Event()  # Set from any thread to stop the search
+
+    def start(self) -> None:
+        """
+        Starts the budget of a search run, the cancel token is kept so a cancel before the start still applies
+        """
+        self.nodes = 0
+        self.deadline = time.perf_counter() + self.time_limit if self.time_limit is not None else None
+
+    def cancel(self) -> None:
+        """
+        Cancels the search, it stops at the next node it enters
+        """
+        self._cancelled.set()
+
+    def cancelled(self) -> bool:
+        """
+        Checks if the search was cancelled
+        :return: True if cancel was called
+        """
+        return self._cancelled.is_set()
+
+    def __call__(self, ply: int, move, alpha, beta) -> None:
+        """
+        Checks the budget when the search enters a node
+        :param ply: The depth of the node
+        :param move: The move that leads to the node
+        :param alpha: The alpha value of the pruning
+        :param beta: The beta value of the pruning
+        """
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchAborted('nodes')
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchAborted('time')
+        if self._cancelled.is_set():
+            raise SearchAborted('cancelled')
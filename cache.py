@@ -0,0 +1,94 @@
+import sqlite3
+
+import chess
+
+from state import State
+
+CACHE_VERSION = 3  # Increase whenever a change to the searches changes their results, stale entries are dropped
+
+
+class SolutionCache:
+    """
+    A persistent cache of solved puzzles in an SQLite database. A solution is keyed by the Zobrist key of the
+    position, the player, the checkmate depth, the search algorithm and the mate move restriction, and holds the
+    solution line in UCI, the utility and the number of states expanded.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens or creates a solution cache, the entries of an older cache version are dropped
+        :param path: The filename of the database
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60)  # Worker processes may write at the same time
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS solutions (key INTEGER, player INTEGER, mate INTEGER, algorithm TEXT, "
+            "restriction TEXT, position TEXT, line TEXT, utility INTEGER, expanded INTEGER, "
+            "PRIMARY KEY (key, player, mate, algorithm, restriction))")
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if row is None or row[0] != CACHE_VERSION:
+            self.connection.execute("DELETE FROM solutions")
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (CACHE_VERSION,))
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, state: State, algorithm: str, restriction: str) -> tuple:
+        """
+        Looks up the solution of a puzzle
+        :param state: The initial state of the puzzle
+        :param algorithm: The name of the search algorithm
+        :param restriction: The name of the mate move restriction
+        :return: A tuple of the solution moves, the utility and the number of states expanded, or None if the puzzle
+        is not in the cache
+        """
+        row = self.connection.execute(
+            "SELECT position, line, utility, expanded FROM solutions WHERE key = ? AND player = ? AND mate = ? AND "
+            "algorithm = ? AND restriction = ?",
+            (to_signed(state.key), state.player, state.mate, algorithm, restriction)).fetchone()
+        if row is None or row[0] != state.position:  # Not cached, or another position with the same key
+            self.misses += 1
+            return None
+        self.hits += 1
+        position, line, utility, expanded = row
+        return [chess.Move.from_uci(uci) for uci in line.split()], utility, expanded
+
+    def put(self, state: State, algorithm: str, restriction: str, moves: list, utility: int, expanded: int) -> None:
+        """
+        Stores the solution of a puzzle
+        :param state: The initial state of the puzzle
+        :param algorithm: The name of the search algorithm
+        :param restriction: The name of the mate move restriction
+        :param moves: The moves of the solution line
+        :param utility: The utility of the solution
+        :param expanded: The number of states expanded to find the solution
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (to_signed(state.key), state.player, state.mate, algorithm, restriction, state.position,
+             ' '.join(move.uci() for move in moves), utility, expanded))
+        self.connection.commit()
+
+    def close(self) -> None:
+        """
+        Closes the database
+        """
+        self.connection.close()
+
+    def __len__(self) -> int:
+        """
+        Gets the number of cached solutions
+        :return: The number of solutions in the cache
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+
+def to_signed(key: int) -> int:
+    """
+    Converts a 64-bit Zobrist key to the signed integer SQLite stores
+    :param key: The Zobrist key
+    :return: The key as a signed 64-bit integer
+    """
+    return key - (1 << 64) if key >= 1 << 63 else key
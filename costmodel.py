@@ -0,0 +1,70 @@
+import json
+import math
+import statistics
+
+import chess
+
+DEPTH_GROWTH = 15  # Growth of the solve time with every move of checkmate depth, measured on puzzles_full
+COST_SCALE = 5e-6  # Seconds of a unit of estimated cost, measured with the transposition search
+
+
+def estimate_cost(puzzle: dict) -> float:
+    """
+    Estimates the cost of solving a puzzle without searching it. The checkmate depth dominates the cost, the root
+    branching factor of both players and the share of checking and capturing moves, which open forcing lines the
+    search follows deeply, refine it.
+    :param puzzle: A puzzle formatted by puzzleloader
+    :return: The estimated seconds to solve the puzzle
+    """
+    board = chess.Board(puzzle['position'])
+    moves = list(board.legal_moves)
+    if not moves:
+        return 0.0
+    forcing = sum(1 for move in moves if board.gives_check(move) or board.is_capture(move))
+    if board.is_check():  # A null move is not legal, take the moves of the player as the replies
+        replies = len(moves)
+    else:
+        board.push(chess.Move.null())
+        replies = max(board.legal_moves.count(), 1)
+    branching = math.sqrt(len(moves) * replies)
+    return COST_SCALE * DEPTH_GROWTH ** puzzle['mate'] * branching * (1 + forcing / len(moves))
+
+
+def load_timings(filenames: list) -> dict:
+    """
+    Loads the solve times of earlier batch runs, the puzzles taken from a solution cache were not solved and are left
+    out
+    :param filenames: The files of the JSON lines written by batch.py
+    :return: A dictionary of the seconds to solve every puzzle, keyed by the position and the checkmate depth
+    """
+    timings = {}
+    for filename in filenames:
+        with open(filename) as f:
+            for line in f:
+                if line.strip():
+                    result = json.loads(line)
+                    if not result.get('stats', {}).get('cached'):
+                        timings[result['position'], result['mate']] = result['time']
+    return timings
+
+
+def order_by_cost(tasks: list, timings: dict = None) -> list:
+    """
+    Orders puzzles to be solved longest first, so the longest puzzles do not start last while the other workers sit
+    idle. The time of an earlier run is used when there is one, and the estimates of the other puzzles are scaled to
+    match those times.
+    :param tasks: The tasks of the puzzles, their third item is the puzzle
+    :param timings: The solve times of earlier runs, keyed by the position and the checkmate depth
+    :return: The tasks in descending order of cost
+    """
+    timings = timings or {}
+    estimates = [estimate_cost(task[2]) for task in tasks]
+    known = [(timings[task[2]['position'], task[2]['mate']], estimate)
+             for task, estimate in zip(tasks, estimates) if (task[2]['position'], task[2]['mate']) in timings]
+    ratios = [time / estimate for time, estimate in known if estimate]
+    scale = statistics.median(ratios) if ratios else 1.0
+
+    costs = [timings.get((task[2]['position'], task[2]['mate']), estimate * scale)
+             for task, estimate in zip(tasks, estimates)]
+    order = sorted(range(len(tasks)), key=lambda index: -costs[index])
+    return [tasks[index] for index in order]
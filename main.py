@@ -1,11 +1,14 @@
+from contextlib import nullcontext
 from enum import Enum
 
 import puzzleloader
 import search
-import state
+from budget import Budget, SearchAborted
+from cache import SolutionCache
 from node import Node
+from searchtrace import SearchTrace
 from state import State
-from state import Heuristic
+from state import Heuristic, Restriction
 
 
 class SearchAlgorithm(Enum):
@@ -16,43 +19,197 @@ class SearchAlgorithm(Enum):
     ALPHA_BETA_PRUNING = 2
     TRANSPOSITION = 3
     KILLER_MOVE_HEURISTIC = 4
+    MAKE_UNMAKE = 5
+    PROOF_NUMBER = 6
+    ITERATIVE_DEEPENING = 7
+    PRINCIPAL_VARIATION = 8
 
 
-def start_problem(initial_state: State, solution, search_type: SearchAlgorithm) -> None:
+SEARCH_NAMES = {
+    SearchAlgorithm.MINIMAX: "MiniMax",
+    SearchAlgorithm.ALPHA_BETA_PRUNING: "MiniMax with Alpha Beta Pruning",
+    SearchAlgorithm.TRANSPOSITION: "MiniMax with Alpha Beta Pruning and Transposition",
+    SearchAlgorithm.KILLER_MOVE_HEURISTIC: "MiniMax with Alpha Beta Pruning, Transposition and Killer Move Heuristic",
+    SearchAlgorithm.MAKE_UNMAKE: "MiniMax with Alpha Beta Pruning on a single board (Make/Unmake)",
+    SearchAlgorithm.PROOF_NUMBER: "Proof-Number Search",
+    SearchAlgorithm.ITERATIVE_DEEPENING: "Iterative Deepening with Alpha Beta Pruning, Transposition and Killer Move "
+                                         "Heuristic",
+    SearchAlgorithm.PRINCIPAL_VARIATION: "Principal Variation Search with Transposition and Mate-Distance Pruning",
+}
+
+# Every heuristic but MVV-LVA, ordering the captures costs more nodes than it saves on the deeper puzzles
+TABLE_HEURISTICS = Heuristic.CHECK | Heuristic.KILLER | Heuristic.HISTORY | Heuristic.TABLE_MOVE
+
+DEFAULT_HEURISTICS = {
+    SearchAlgorithm.MINIMAX: Heuristic.NONE,
+    SearchAlgorithm.ALPHA_BETA_PRUNING: Heuristic.NONE,
+    SearchAlgorithm.TRANSPOSITION: Heuristic.NONE,
+    SearchAlgorithm.KILLER_MOVE_HEURISTIC: TABLE_HEURISTICS,
+    SearchAlgorithm.MAKE_UNMAKE: Heuristic.NONE,
+    SearchAlgorithm.PROOF_NUMBER: Heuristic.CHECK,
+    SearchAlgorithm.ITERATIVE_DEEPENING: TABLE_HEURISTICS,
+    SearchAlgorithm.PRINCIPAL_VARIATION: TABLE_HEURISTICS,
+}
+
+# Searches that start with an empty transposition table
+TABLE_SEARCHES = {SearchAlgorithm.TRANSPOSITION, SearchAlgorithm.KILLER_MOVE_HEURISTIC,
+                  SearchAlgorithm.ITERATIVE_DEEPENING, SearchAlgorithm.PRINCIPAL_VARIATION}
+
+
+def run_search(initial_state: State, search_type: SearchAlgorithm, restriction: Restriction = Restriction.NONE,
+               profile: bool = False, cache: SolutionCache = None, budget: Budget = None,
+               heuristic: Heuristic = None, trace: str = None) -> (Node, int):
+    """
+    Runs a search algorithm on a chess puzzle problem, the statistics of the run are left in search.stats
+    :param initial_state: The initial state to start with
+    :param search_type: The search algorithm to use
+    :param restriction: The mate move restriction to use, MiniMax always searches every move
+    :param profile: Whether to time the move generation, successor creation, SAN formatting, terminal tests and
+    utilities of the run
+    :param cache: A solution cache to look the puzzle up in before searching and to store the solution in after
+    :param budget: Limits on the time and nodes of the search, when they run out the best proven result so far is
+    returned and search.stats.aborted tells why
+    :param heuristic: The move ordering heuristics to use, default is the heuristics of the search algorithm in
+    DEFAULT_HEURISTICS, MiniMax never orders its moves
+    :param trace: The filename to write a trace of every node the search visits to, default is no trace
+    :return: The best terminal node and number of states expanded to get there
+    """
+    if heuristic is None:
+        heuristic = DEFAULT_HEURISTICS.get(search_type, Heuristic.NONE)
+    initial_node = Node(True, initial_state, 0)
+    algorithm = search_type.name  # The key of the solution in the cache
+    if heuristic != DEFAULT_HEURISTICS.get(search_type, Heuristic.NONE):
+        algorithm += ":" + str(int(heuristic))
+    if cache is not None:  # Looked up before the transposition table is cleared, a cache hit leaves it untouched
+        cached = cache.get(initial_state, algorithm, restriction.name)
+        if cached is not None:  # Solved before, only the nodes of the solution line are created
+            moves, utility, expanded = cached
+            search.stats.start(search.transposition_table)
+            search.stats.cached = True
+            terminal = initial_node.follow(moves)
+            search.stats.finish(search.transposition_table)
+            return terminal, expanded
+
+    if search_type in TABLE_SEARCHES:
+        search.transposition_table.clear()  # Ensure the transposition table is empty
+    search.transposition_table.new_search()  # Entries of earlier searches are replaced first
+    search.stats.start(search.transposition_table)
+    if budget is not None:
+        budget.start()
+        search.stats.on_enter(budget)
+    search.move_ordering.clear()
+    search.stats.on_cutoff(search.move_ordering)  # The killer moves and history scores learn from the cutoffs
+    tracer = SearchTrace(trace) if trace is not None else None
+    if tracer is not None:
+        search.stats.on_exit(tracer)
+    try:
+        with search.stats.profiling() if profile else nullcontext():
+            if search_type == SearchAlgorithm.MINIMAX:
+                terminal, expanded = search.minimax(initial_node)
+            elif search_type == SearchAlgorithm.ALPHA_BETA_PRUNING:
+                terminal, expanded = search.alpha_beta_pruning(initial_node, -1, 1, restriction, heuristic)
+            elif search_type == SearchAlgorithm.TRANSPOSITION:
+                terminal, expanded = search.transposition(initial_node, -1, 1, restriction, heuristic)
+            elif search_type == SearchAlgorithm.KILLER_MOVE_HEURISTIC:
+                terminal, expanded = search.killer_move_heuristic(initial_node, -1, 1, heuristic, restriction)
+            elif search_type == SearchAlgorithm.MAKE_UNMAKE:
+                terminal, expanded = search.make_unmake(initial_node, -1, 1, restriction, heuristic)
+            elif search_type == SearchAlgorithm.PROOF_NUMBER:
+                terminal, expanded = search.proof_number(initial_node, restriction, heuristic)
+            elif search_type == SearchAlgorithm.ITERATIVE_DEEPENING:
+                terminal, expanded = search.iterative_deepening(initial_node, heuristic, restriction)
+            elif search_type == SearchAlgorithm.PRINCIPAL_VARIATION:
+                terminal, expanded = search.principal_variation(initial_node, heuristic, restriction)
+            else:
+                raise ValueError("Invalid Search Algorithm")
+        if cache is not None:
+            cache.put(initial_state, algorithm, restriction.name, terminal.line(), terminal.state.utility(), expanded)
+        return terminal, expanded
+    except SearchAborted as aborted:
+        # MiniMax and PVS go on searching after a checkmate of the initial node and keep the best one found so far,
+        # the alpha-beta searches stop at the first one, so without it the initial node is the best result
+        search.stats.aborted = aborted.reason
+        if search.stats.proven is not None:
+            return search.stats.proven, search.stats.expanded
+        return initial_node, search.stats.expanded
+    finally:
+        search.stats.cutoff_callbacks.remove(search.move_ordering)
+        if budget is not None:
+            search.stats.enter_callbacks.remove(budget)
+        if tracer is not None:
+            search.stats.exit_callbacks.remove(tracer)
+            tracer.close()
+        search.stats.finish(search.transposition_table)
+
+
+def result_status(terminal: Node, stats) -> str:
+    """
+    Describes the result of a search run
+    :param terminal: The terminal node returned by the search
+    :param stats: The SearchStats of the run
+    :return: A short description of the result
+    """
+    if terminal.state.utility() == 1:
+        return "mate found in " + str((terminal.depth + 1) // 2)
+    elif stats.aborted is not None:
+        status = "no mate proven within budget (" + stats.aborted + ")"
+        if stats.proven_depth:
+            status += ", no mate in " + str(stats.proven_depth)
+        return status
+    return "no mate found"
+
+
+def print_stats(stats) -> None:
+    """
+    Prints the statistics of a search run
+    :param stats: The SearchStats of the run
+    """
+    summary = stats.summary()
+    if summary['cached']:
+        print("Solution found in the solution cache")
+        return
+    print("Nodes by Ply:", summary['nodes_by_ply'])
+    print("Effective Branching Factor:", round(summary['effective_branching_factor'], 2))
+    print("Cutoffs:", summary['cutoffs'], "(first move: " + str(round(100 * summary['first_move_cutoff_rate'], 1)) +
+          "%)")
+    if summary['table_probes']:
+        print("Transposition Table: probes", summary['table_probes'], "hits", summary['table_hits'], "stores",
+              summary['table_stores'])
+    for category, seconds in sorted(summary['times'].items(), key=lambda item: -item[1]):
+        print("Time in " + category + ":", round(seconds, 3), "seconds")
+    print("Search Time:", round(summary['wall_time'], 3), "seconds")
+
+
+def start_problem(initial_state: State, solution, search_type: SearchAlgorithm,
+                  restriction: Restriction = Restriction.NONE, profile: bool = False,
+                  cache: SolutionCache = None, budget: Budget = None) -> None:
     """
     Start a new chess puzzle problem
     :param initial_state: The initial state to start with
     :param solution: The Actual solution of the problem
     :param search_type: The search algorithm to use
+    :param restriction: The mate move restriction to use
+    :param profile: Whether to print where the time of the search was spent
+    :param cache: A solution cache to look the puzzle up in before searching
+    :param budget: Limits on the time and nodes of the search
     """
-    initial_node = Node(True, initial_state, 0)
     print("------------------------------------------------------------")
     print("Starting Chess Puzzle Problem: ")
-    if search_type == SearchAlgorithm.MINIMAX:
-        print("Search Algorithm: MiniMax")
-        print("------------------------------------------------------------")
-        terminal, expanded = search.minimax(initial_node)
-    elif search_type == SearchAlgorithm.ALPHA_BETA_PRUNING:
-        print("Search Algorithm: MiniMax with Alpha Beta Pruning")
-        print("------------------------------------------------------------")
-        terminal, expanded = search.alpha_beta_pruning(initial_node, -1, 1)
-    elif search_type == SearchAlgorithm.TRANSPOSITION:
-        search.transposition_table.clear()  # Ensure the transposition table is empty
-        print("Search Algorithm: MiniMax with Alpha Beta Pruning and Transposition")
-        print("------------------------------------------------------------")
-        terminal, expanded = search.transposition(initial_node, -1, 1)
-    elif search_type == SearchAlgorithm.KILLER_MOVE_HEURISTIC:
-        search.transposition_table.clear()  # Ensure the transposition table is empty
-        print("Search Algorithm: MiniMax with Alpha Beta Pruning, Transposition and Killer Move Heuristic")
-        print("------------------------------------------------------------")
-        terminal, expanded = search.killer_move_heuristic(initial_node, -1, 1, Heuristic.CHECK)
-    else:
+    if search_type not in SEARCH_NAMES:
         print("Invalid Search Algorithm")
         return
+    print("Search Algorithm:", SEARCH_NAMES[search_type])
+    print("------------------------------------------------------------")
+
+    terminal, expanded = run_search(initial_state, search_type, restriction, profile, cache, budget)
 
     print("Number of States Expanded:", expanded)
+    if restriction != Restriction.NONE:
+        print("Number of Moves Skipped:", sum(search.stats.skipped.values()))
+    print_stats(search.stats)
+    print("Result:", result_status(terminal, search.stats).capitalize())
     print("Utility:", terminal.state.utility())
-    print("Initial Position:", state.position)
+    print("Initial Position:", initial_state.position)
     print("Solution Path:", str(terminal))
     print("Actual Solution:", solution)
     print("------------------------------------------------------------")
@@ -1,28 +1,87 @@
+import chess
+
 from state import State
+from ttable import pack_move, unpack_move
 
 
 class Node:
-    def __init__(self, is_max_node: bool, state: State, depth: int, parent: 'Node' = None, action: str = None):
+    __slots__ = ('is_max_node', 'state', 'depth', 'parent', '_move')
+
+    def __init__(self, is_max_node: bool, state: State, depth: int, parent: 'Node' = None, move: chess.Move = None):
         """
         Initialise the Node
         :param is_max_node: Whether the node is a max node or min mode
         :param state: The state of the node
         :param depth: The depth of the node i.e., number of moves that leads to the chess position
         :param parent: The parent of the node
-        :param action: The move that leads to the creation of this node
+        :param move: The move that leads to the creation of this node
         """
         self.is_max_node = is_max_node
         self.state = state
         self.depth = depth
         self.parent = parent
-        self.action = action
+        self._move = pack_move(move)  # Packed into 16 bits
+
+    @property
+    def move(self) -> chess.Move:
+        """
+        The move that leads to the creation of this node
+        :return: The move, or None for the initial node
+        """
+        return unpack_move(self._move)
+
+    @property
+    def action(self) -> str:
+        """
+        The string representation of the move, it is only formatted when it is needed
+        :return: The move in Standard Algebraic Notation
+        """
+        if self.parent is None:
+            return None
+        return self.parent.state.board.san(self.move)
 
     def __str__(self):
         """
         The string representation of the Node
         :return: The path from the initial node to this node
         """
-        if self.parent is None:
-            return ""
-        return str(self.parent) + " -> " + self.action
+        return "".join(" -> " + action for action in self.path())
 
+    def path(self) -> list:
+        """
+        The moves of the path from the initial node to this node, replayed from the initial position
+        :return: A list of the moves in order
+        """
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        board = node.state.board.copy(stack=False)
+        actions = []
+        for move in self.line():
+            actions.append(board.san(move))
+            board.push(move)
+        return actions
+
+    def line(self) -> list:
+        """
+        The moves of the path from the initial node to this node
+        :return: A list of the chess moves in order
+        """
+        moves = []
+        node = self
+        while node.parent is not None:
+            moves.append(node.move)
+            node = node.parent
+        moves.reverse()
+        return moves
+
+    def follow(self, moves) -> 'Node':
+        """
+        Creates the nodes of a line of moves played from this node
+        :param moves: The legal moves of the line in order
+        :return: The node at the end of the line
+        """
+        node = self
+        for move in moves:
+            node = Node(not node.is_max_node, node.state.successor(move), node.depth + 1, node, move)
+        return node
@@ -0,0 +1,61 @@
+from array import array
+
+import chess
+
+MAX_PLY = 64  # Deeper plies than any puzzle of the solver
+
+
+class MoveOrdering:
+    """
+    Killer moves and history scores learned from the beta cutoffs of a search run. It is registered as a cutoff
+    callback of the search statistics, so every search that reports its cutoffs feeds it.
+    """
+    SLOTS = 2  # Number of killer moves kept per ply
+
+    def __init__(self):
+        """
+        Initialises empty killer slots and history scores
+        """
+        self.killers = [()] * MAX_PLY
+        self.history = array('L', [0] * (2 * 64 * 64))
+
+    def clear(self) -> None:
+        """
+        Forgets every killer move and history score
+        """
+        self.killers = [()] * MAX_PLY
+        self.history = array('L', [0] * (2 * 64 * 64))
+
+    def killer_moves(self, ply: int) -> tuple:
+        """
+        Gets the killer moves of a ply
+        :param ply: The depth of the position
+        :return: The killer moves, the most recent first
+        """
+        return self.killers[ply]
+
+    def history_key(self, ply: int):
+        """
+        Gets the history score function of the side to move at a ply, the side is told apart by the parity of the ply
+        :param ply: The depth of the position
+        :return: A function of a move that gives its history score
+        """
+        history = self.history
+        side = (ply & 1) << 12
+        return lambda move: history[side | move.from_square << 6 | move.to_square]
+
+    def __call__(self, ply: int, move: chess.Move, index: int, board: chess.Board) -> None:
+        """
+        Learns from a beta cutoff of a quiet move, the move becomes the newest killer move of its ply and its history
+        score grows more for cutoffs near the root, where they save the most. Captures and checks are left out, they
+        are ordered by their own stages and would only crowd out the quiet moves.
+        :param ply: The depth of the node that is cut off
+        :param move: The move that caused the cutoff
+        :param index: The index of the move among the searched moves
+        :param board: The board of the node that is cut off
+        """
+        if board.is_capture(move) or board.gives_check(move):
+            return
+        if move not in self.killers[ply]:
+            self.killers[ply] = ((move,) + self.killers[ply])[:self.SLOTS]
+        self.history[(ply & 1) << 12 | move.from_square << 6 | move.to_square] += (MAX_PLY - ply) ** 2
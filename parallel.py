@@ -0,0 +1,129 @@
+import argparse
+import multiprocessing
+import time
+
+import chess
+
+import puzzleloader
+import search
+from main import SearchAlgorithm, run_search
+from node import Node
+from state import Heuristic, Restriction, State, mate_moves
+from ttable import SharedTranspositionTable
+
+
+def init_worker(name: str, megabytes: int) -> None:
+    """
+    Initializes a worker process, every worker searches with the shared transposition table
+    :param name: The name of the shared memory of the table
+    :param megabytes: The memory budget of the table
+    """
+    search.transposition_table = SharedTranspositionTable(megabytes, name)
+    search.stats.on_cutoff(search.move_ordering)  # Every worker learns its own killer moves and history scores
+
+
+def search_root_move(task: tuple) -> tuple:
+    """
+    Searches the subtree of one move of the initial position, this runs inside a worker process
+    :param task: A tuple of the player, the FEN position, the checkmate depth, the move in UCI, the alpha value of
+    the pruning, the heuristic and the mate move restriction
+    :return: A tuple of the move in UCI, its value, the number of moves to the terminal state and the number of
+    states expanded
+    """
+    player, position, mate, uci, alpha, heuristic, restriction = task
+    move = chess.Move.from_uci(uci)
+    successor = State(player, position, mate).successor(move)
+    value, distance, expanded = search.table_search(successor, False, alpha, 1, heuristic, restriction, 1, move)
+    return uci, value, distance + 1, expanded
+
+
+def parallel_search(node: Node, workers: int = None, heuristic: Heuristic = Heuristic.ALL,
+                    restriction: Restriction = Restriction.NONE, megabytes: int = 32) -> (Node, int):
+    """
+    Root split parallel search of the max node of a puzzle. The first move is searched serially, like the eldest
+    brother of Young Brothers Wait, and its value is the alpha of the other moves, which are searched on a pool of
+    worker processes sharing one transposition table. The search stops at the first checkmate.
+    :param node: The initial Node, a max node
+    :param workers: The number of worker processes, default is the number of CPUs
+    :param heuristic: The type of heuristic to use
+    :param restriction: The mate move restriction to use
+    :param megabytes: The memory budget of the shared transposition table
+    :return: The best terminal node and number of states expanded to get there, the states expanded by the searches
+    stopped at the checkmate are left out
+    """
+    state = node.state
+    if state.terminal_test():
+        return node, 0
+
+    table = SharedTranspositionTable(megabytes)
+    serial_table, search.transposition_table = search.transposition_table, table
+    search.move_ordering.clear()
+    search.stats.on_cutoff(search.move_ordering)
+    try:
+        moves = list(mate_moves(state.board, state.player, state.mate, heuristic, restriction, search.stats.skipped,
+                                None, search.move_ordering, node.depth))
+        if not moves:  # The restriction left no move to search, so there is no mate from here
+            return node, 1
+
+        first = moves[0]
+        best_val, best_distance, expanded = search.table_search(state.successor(first), False, -1, 1, heuristic,
+                                                                restriction, node.depth + 1, first)
+        best_distance += 1
+        best_move = first
+        total_expanded = 1 + expanded
+
+        if best_val < 1 and len(moves) > 1:
+            tasks = [(state.player, state.position, state.mate, move.uci(), best_val, heuristic, restriction)
+                     for move in moves[1:]]
+            with multiprocessing.Pool(workers, initializer=init_worker, initargs=(table.name, megabytes)) as pool:
+                for uci, val, distance, expanded in pool.imap_unordered(search_root_move, tasks):
+                    total_expanded += expanded
+                    if val > best_val:  # Update the best value and move
+                        best_val, best_distance, best_move = val, distance, chess.Move.from_uci(uci)
+                    elif val == best_val and best_val < 0 and distance > best_distance:
+                        # If we are losing, choose the biggest depth
+                        best_distance, best_move = distance, chess.Move.from_uci(uci)
+
+                    if best_val >= 1:  # A checkmate is found, the pool is terminated with the other searches
+                        break
+
+        child = Node(not node.is_max_node, state.successor(best_move), node.depth + 1, node, best_move)
+        return search.table_path(child, heuristic, restriction, total_expanded)
+    finally:
+        search.stats.cutoff_callbacks.remove(search.move_ordering)
+        search.transposition_table = serial_table
+        table.close(unlink=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Solve one puzzle with the parallel search and report the speedup")
+    parser.add_argument('file', help="The puzzle file")
+    parser.add_argument('-i', '--index', type=int, default=0, help="The index of the puzzle in the file")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="The number of worker processes, default is the number of CPUs")
+    parser.add_argument('-r', '--restriction', default=Restriction.NONE.name,
+                        choices=[restriction.name for restriction in Restriction],
+                        help="The mate move restriction to use")
+    args = parser.parse_args()
+
+    index, puzzle = next(puzzleloader.iter_puzzles(args.file, start=args.index, stop=args.index + 1))
+    restriction = Restriction[args.restriction]
+
+    start = time.perf_counter()
+    terminal, expanded = run_search(State(puzzle['player'], puzzle['position'], puzzle['mate']),
+                                    SearchAlgorithm.KILLER_MOVE_HEURISTIC, restriction)
+    serial_time = time.perf_counter() - start
+    print("Serial:  ", terminal.state.utility(), str(terminal), expanded, "states", round(serial_time, 3), "seconds")
+
+    start = time.perf_counter()
+    initial_node = Node(True, State(puzzle['player'], puzzle['position'], puzzle['mate']), 0)
+    terminal, expanded = parallel_search(initial_node, args.workers, Heuristic.ALL, restriction)
+    parallel_time = time.perf_counter() - start
+    print("Parallel:", terminal.state.utility(), str(terminal), expanded, "states", round(parallel_time, 3),
+          "seconds")
+    print("Speedup: ", round(serial_time / parallel_time, 2), "with", args.workers or multiprocessing.cpu_count(),
+          "workers")
+
+
+if __name__ == '__main__':
+    main()
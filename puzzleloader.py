@@ -1,33 +1,115 @@
+import csv
+import os
 import re
+from enum import Enum
+from functools import partial
+from typing import Iterator
 
+import chess
 
-def load_puzzle_file(filename: str) -> list:
+GAME_RESULTS = ('*', '1-0', '0-1', '1/2-1/2')  # Result tokens that end some solution lines, they are not moves
+
+
+class PuzzleFormat(Enum):
+    """
+    Enumeration of Puzzle File Formats
+    """
+    WTHARVEY = 1  # Blocks of a metadata line, a FEN line and a numbered solution line
+    EPD = 2  # One EPD record per line, with a dm operation and optional bm, pv and id operations
+    CSV = 3  # A header row and one puzzle per row, with FEN and Moves columns
+
+
+def puzzle_format(filename: str) -> PuzzleFormat:
+    """
+    Guesses the format of a puzzle file from its extension
+    :param filename: The puzzle filename
+    :return: The format of the file
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.epd':
+        return PuzzleFormat.EPD
+    elif extension == '.csv':
+        return PuzzleFormat.CSV
+    return PuzzleFormat.WTHARVEY
+
+
+def load_puzzle_file(filename: str, file_format: PuzzleFormat = None) -> list:
     """
     Loads puzzles from a file
     :param filename: The puzzle filename
+    :param file_format: The format of the file, guessed from the extension by default
     :return: A list of the puzzles
     """
+    return [puzzle for index, puzzle in iter_puzzles(filename, file_format)]
+
+
+def iter_puzzles(filename: str, file_format: PuzzleFormat = None, start: int = 0, stop: int = None, shard: int = 0,
+                 shards: int = 1) -> Iterator[tuple]:
+    """
+    Lazily reads the puzzles of a file one record at a time, records outside the range or the shard are skipped
+    without being parsed
+    :param filename: The puzzle filename
+    :param file_format: The format of the file, guessed from the extension by default
+    :param start: The index of the first record to read
+    :param stop: The index after the last record to read, default is the end of the file
+    :param shard: The shard to read, a record belongs to the shard of its index modulo the number of shards
+    :param shards: The number of shards the file is split into
+    :return: An iterator of the record indexes and the puzzles
+    """
+    if file_format is None:
+        file_format = puzzle_format(filename)
+    read_records = {
+        PuzzleFormat.WTHARVEY: wtharvey_records,
+        PuzzleFormat.EPD: epd_records,
+        PuzzleFormat.CSV: csv_records,
+    }[file_format]
 
-    f = open(filename, "r")
+    with open(filename, "r", newline='' if file_format == PuzzleFormat.CSV else None) as f:
+        for index, record in enumerate(read_records(f)):
+            if stop is not None and index >= stop:
+                break
+            if index < start or index % shards != shard:
+                continue
+            yield index, record()
 
-    puzzles = []
 
-    next_line = f.readline().rstrip('\n')
-    while next_line:
-        puzzles.append(
-            format_puzzle(
-                next_line,
-                f.readline().rstrip('\n'),
-                f.readline().rstrip('\n')
-            )
-        )
-        #  Ignore two empty white space
-        f.readline()
-        f.readline()
+def wtharvey_records(f) -> Iterator:
+    """
+    Reads the records of a puzzle file of blocks separated by empty lines
+    :param f: The open puzzle file
+    :return: An iterator of functions that format each record
+    """
+    lines = []
+    for line in f:
+        if line.strip():
+            lines.append(line.rstrip('\n'))
+        elif lines:
+            yield partial(format_puzzle, *lines[-3:])
+            lines = []
+    if lines:
+        yield partial(format_puzzle, *lines[-3:])
 
-        next_line = f.readline().rstrip('\n')
 
-    return puzzles
+def epd_records(f) -> Iterator:
+    """
+    Reads the records of an EPD file, one position per line
+    :param f: The open puzzle file
+    :return: An iterator of functions that format each record
+    """
+    for line in f:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield partial(format_epd, line)
+
+
+def csv_records(f) -> Iterator:
+    """
+    Reads the records of a CSV file with a header row
+    :param f: The open puzzle file
+    :return: An iterator of functions that format each record
+    """
+    for row in csv.DictReader(f):
+        yield partial(format_csv, row)
 
 
 def format_puzzle(meta_line: str, position_line: str, solution_line: str):
@@ -81,3 +163,96 @@ def format_puzzle(meta_line: str, position_line: str, solution_line: str):
         'mate': len(solution),
         'solution': solution
     }
+
+
+def solution_moves(puzzle: dict) -> list:
+    """
+    Flattens the solution of a puzzle to the list of its moves
+    :param puzzle: A puzzle formatted by format_puzzle
+    :return: The moves of the solution in order
+    """
+    moves = []
+    for move in puzzle['solution']:
+        if 'w' in move:
+            moves.append(move['w'])
+        if 'b' in move:
+            moves.append(move['b'])
+    return [move for move in moves if move not in GAME_RESULTS]
+
+
+def format_solution(moves: list, player: bool) -> list:
+    """
+    Groups the moves of a solution line into moves of White and Black
+    :param moves: The moves of the solution in Standard Algebraic Notation
+    :param player: The player to move first, True for WHITE and False for BLACK
+    :return: The solution formatted like the solution of format_puzzle
+    """
+    solution = []
+    if moves and not player:  # The first move is black
+        solution.append({'b': moves[0]})
+        moves = moves[1:]
+    for i in range(0, len(moves), 2):
+        if i + 1 < len(moves):
+            solution.append({'w': moves[i], 'b': moves[i + 1]})
+        else:  # The last move is white
+            solution.append({'w': moves[i]})
+    return solution
+
+
+def format_epd(line: str) -> dict:
+    """
+    Formats an EPD record to a dictionary, the checkmate depth comes from the dm operation and the solution from the
+    pv operation, or the bm operation when there is no pv
+    :param line: Line of the EPD record
+    :return: A dictionary of the puzzle
+    """
+    board, operations = chess.Board.from_epd(line)
+    if 'pv' in operations:
+        moves = []
+        replay = board.copy()
+        for move in operations['pv']:
+            moves.append(replay.san(move))
+            replay.push(move)
+    elif 'bm' in operations:
+        moves = [board.san(operations['bm'][0])]
+    else:
+        moves = []
+
+    return {
+        'meta': {'id': operations.get('id', '')},
+        'player': board.turn,
+        'position': board.fen(),
+        'mate': operations['dm'] if 'dm' in operations else (len(moves) + 1) // 2,
+        'solution': format_solution(moves, board.turn)
+    }
+
+
+def format_csv(row: dict) -> dict:
+    """
+    Formats a CSV row to a dictionary. The Moves column holds the solution line in UCI or SAN. In Lichess puzzle
+    exports, recognised by their PuzzleId column, the first move is the move of the opponent that sets up the puzzle.
+    :param row: The row of the CSV file
+    :return: A dictionary of the puzzle
+    """
+    board = chess.Board(row.get('FEN') or row['fen'])
+    moves = (row.get('Moves') or row.get('moves') or '').split()
+    if 'PuzzleId' in row and moves:  # Play the setup move of the opponent
+        board.push_uci(moves.pop(0))
+
+    solution = []
+    replay = board.copy()
+    for move in moves:
+        try:
+            move = replay.parse_uci(move)
+        except ValueError:
+            move = replay.parse_san(move)
+        solution.append(replay.san(move))
+        replay.push(move)
+
+    return {
+        'meta': {'id': row.get('PuzzleId') or row.get('id', '')},
+        'player': board.turn,
+        'position': board.fen(),
+        'mate': (len(solution) + 1) // 2,
+        'solution': format_solution(solution, board.turn)
+    }
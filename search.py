@@ -1,8 +1,15 @@
 import math
-from copy import deepcopy
+
+import chess
 
 from node import Node
-from state import Heuristic
+from state import Heuristic, Restriction, State, board_utility, mate_moves
+from ordering import MoveOrdering
+from stats import SearchStats
+from ttable import Bound, TranspositionTable
+
+stats = SearchStats()  # Statistics of the current search run
+move_ordering = MoveOrdering()  # Killer moves and history scores of the current search run
 
 
 def minimax(node: Node) -> (Node, int):
@@ -11,63 +18,73 @@ def minimax(node: Node) -> (Node, int):
     :param node: The current Node
     :return: The best terminal node and number of states expanded to get there
     """
+    stats.enter(node.depth, node.move, -math.inf, math.inf)
     if node.state.terminal_test():  # Terminal Node
+        stats.exit(node.depth, node.move, -math.inf, math.inf, node.state.utility())
         return node, 0
     elif node.is_max_node:  # Max Node
         total_expanded = 1
+        stats.expanded += 1
         best_val = -math.inf
         best_node = None
 
-        successors = node.state.find_successors()
-        while not successors.empty():  # Go through the successors
-            (priority, (action, state)) = successors.get()
-            successor = Node(False, state, node.depth + 1, node, action)
+        for move, state in node.state.find_successors():  # Go through the successors
+            successor = Node(False, state, node.depth + 1, node, move)
             terminal, expanded = minimax(successor)
             total_expanded += expanded
             if terminal.state.utility() > best_val:  # Update the best value and node
                 best_val = terminal.state.utility()
                 best_node = terminal
+                if node.parent is None and best_val == 1:  # Kept in case the search is aborted before it ends
+                    stats.proven = best_node
 
+        stats.exit(node.depth, node.move, -math.inf, math.inf, best_val)
         return best_node, total_expanded
 
     else:  # Min Node
         total_expanded = 1
+        stats.expanded += 1
         best_val = math.inf
         best_node = None
 
-        successors = node.state.find_successors()
-        while not successors.empty():
-            (priority, (action, state)) = successors.get()
-            successor = Node(True, state, node.depth + 1, node, action)
+        for move, state in node.state.find_successors():
+            successor = Node(True, state, node.depth + 1, node, move)
             terminal, expanded = minimax(successor)
             total_expanded += expanded
             if terminal.state.utility() < best_val:  # Update the best value and node
                 best_val = terminal.state.utility()
                 best_node = terminal
 
+        stats.exit(node.depth, node.move, -math.inf, math.inf, best_val)
         return best_node, total_expanded
 
 
-def alpha_beta_pruning(node: Node, alpha, beta):
+def alpha_beta_pruning(node: Node, alpha, beta, restriction: Restriction = Restriction.NONE,
+                       heuristic: Heuristic = Heuristic.NONE):
     """
     Minimax algorithm with Alpha-Beta Pruning
     :param node: The current Node
     :param alpha: The alpha value of the pruning
     :param beta: The beta value of the pruning
+    :param restriction: The mate move restriction to use
+    :param heuristic: The move ordering heuristics to use
     :return: The best terminal node and number of states expanded to get there
     """
+    stats.enter(node.depth, node.move, alpha, beta)
+    alpha_original, beta_original = alpha, beta
     if node.state.terminal_test():  # Terminal Node
+        stats.exit(node.depth, node.move, alpha, beta, node.state.utility())
         return node, 0
     elif node.is_max_node:  # Max Node
         total_expanded = 1
+        stats.expanded += 1
         best_val = -math.inf
         best_node = None
 
-        successors = node.state.find_successors()
-        while not successors.empty():
-            (priority, (action, state)) = successors.get()
-            successor = Node(False, state, node.depth + 1, node, action)
-            terminal, expanded = alpha_beta_pruning(successor, alpha, beta)
+        for index, (move, state) in enumerate(node.state.find_successors(heuristic, restriction, stats.skipped,
+                                                                          ordering=move_ordering, ply=node.depth)):
+            successor = Node(False, state, node.depth + 1, node, move)
+            terminal, expanded = alpha_beta_pruning(successor, alpha, beta, restriction, heuristic)
             total_expanded += expanded
 
             if terminal.state.utility() > best_val:  # Update the best value and node
@@ -85,20 +102,26 @@ def alpha_beta_pruning(node: Node, alpha, beta):
 
             # Alpha Beta Pruning
             if beta <= alpha:
+                stats.cutoff(node.depth, move, index, node.state.board)
                 break
 
+        if best_node is None:  # The restriction left no move to search, so there is no mate from here
+            stats.exit(node.depth, node.move, alpha_original, beta_original, 0)
+            return node, total_expanded
+
+        stats.exit(node.depth, node.move, alpha_original, beta_original, best_val, beta <= alpha)
         return best_node, total_expanded
 
     else:  # Min Node
         total_expanded = 1
+        stats.expanded += 1
         best_val = math.inf
         best_node = None
 
-        successors = node.state.find_successors()
-        while not successors.empty():
-            (priority, (action, state)) = successors.get()
-            successor = Node(True, state, node.depth + 1, node, action)
-            terminal, expanded = alpha_beta_pruning(successor, alpha, beta)
+        for index, (move, state) in enumerate(node.state.find_successors(heuristic, restriction, stats.skipped,
+                                                                          ordering=move_ordering, ply=node.depth)):
+            successor = Node(True, state, node.depth + 1, node, move)
+            terminal, expanded = alpha_beta_pruning(successor, alpha, beta, restriction, heuristic)
             total_expanded += expanded
 
             if terminal.state.utility() < best_val:  # Update the best value and node
@@ -116,174 +139,674 @@ def alpha_beta_pruning(node: Node, alpha, beta):
 
             # Alpha Beta Pruning
             if beta <= alpha:
+                stats.cutoff(node.depth, move, index, node.state.board)
                 break
 
+        stats.exit(node.depth, node.move, alpha_original, beta_original, best_val, beta <= alpha)
         return best_node, total_expanded
 
 
-transposition_table: dict[str, Node] = {}
-
-
-def transposition(node: Node, alpha, beta):
+def make_unmake(node: Node, alpha, beta, restriction: Restriction = Restriction.NONE,
+                heuristic: Heuristic = Heuristic.NONE):
     """
-    Minimax algorithm with Alpha-Beta Pruning and Transposition
+    Minimax algorithm with Alpha-Beta Pruning that makes and unmakes the moves on a single board instead of creating
+    a State for every successor. Only the nodes of the best path are created once the search is done.
     :param node: The current Node
     :param alpha: The alpha value of the pruning
     :param beta: The beta value of the pruning
+    :param restriction: The mate move restriction to use
+    :param heuristic: The move ordering heuristics to use
     :return: The best terminal node and number of states expanded to get there
     """
-    if node.state.position in transposition_table:
-        best_node = deepcopy(transposition_table[node.state.position])
-        pointer = best_node
-        while node.state != pointer.state:
-            pointer = pointer.parent
-        pointer.parent = node.parent
-        return best_node, 0
-    elif node.state.terminal_test():  # Terminal Node
-        return node, 0
-    elif node.is_max_node:  # Max Node
+    state = node.state
+    board = state.board.copy()  # Leave the board of the node untouched
+    value, line, expanded = make_unmake_board(board, node.is_max_node, state.player, state.mate, alpha, beta,
+                                               restriction, node.depth, node.move, heuristic)
+
+    return node.follow(line), expanded  # Create the nodes of the best path
+
+
+def make_unmake_board(board: chess.Board, is_max_node: bool, player: bool, mate: int, alpha, beta,
+                      restriction: Restriction = Restriction.NONE, ply: int = 0, move: chess.Move = None,
+                      heuristic: Heuristic = Heuristic.NONE) -> (int, tuple, int):
+    """
+    Minimax algorithm with Alpha-Beta Pruning on a single board, the moves are pushed as the search descends and
+    popped as it unwinds
+    :param board: The chess board of the current position
+    :param is_max_node: Whether the current position is a max node or min node
+    :param player: The player to solve the puzzle for, True for WHITE and False for BLACK
+    :param mate: There is a checkmate in n moves
+    :param alpha: The alpha value of the pruning
+    :param beta: The beta value of the pruning
+    :param restriction: The mate move restriction to use
+    :param ply: The depth of the position
+    :param move: The move that leads to the position
+    :param heuristic: The move ordering heuristics to use
+    :return: The best utility, the moves that lead to the best terminal position and number of states expanded
+    """
+    stats.enter(ply, move, alpha, beta)
+    alpha_original, beta_original = alpha, beta
+    if board.is_game_over() or mate == 0:  # Terminal Node
+        value = board_utility(board, player)
+        stats.exit(ply, move, alpha, beta, value)
+        return value, (), 0
+    elif is_max_node:  # Max Node
         total_expanded = 1
+        stats.expanded += 1
         best_val = -math.inf
-        best_node = None
-
-        successors = node.state.find_successors()
-        while not successors.empty():
-            (priority, (action, state)) = successors.get()
-            n = Node(False, state, node.depth + 1, node, action)
-            terminal, expanded = transposition(n, alpha, beta)
+        best_line = None
+
+        moves = mate_moves(board, player, mate, heuristic, restriction, stats.skipped, None, move_ordering, ply)
+        for index, child in enumerate(moves):  # Same order as State.find_successors
+            board.push(child)
+            new_mate = mate if board.turn else mate - 1  # decrement mate only if Black moves
+            val, line, expanded = make_unmake_board(board, False, player, new_mate, alpha, beta, restriction, ply + 1,
+                                                    child, heuristic)
+            board.pop()
             total_expanded += expanded
 
-            if terminal.state.utility() > best_val:  # Update the best value and node
-                best_val = terminal.state.utility()
-                best_node = terminal
-            elif terminal.state.utility() == best_val:  # If best value is the same, choose best node by depth
-                if best_val > 0 and terminal.depth < best_node.depth:
+            if val > best_val:  # Update the best value and line
+                best_val = val
+                best_line = (child,) + line
+            elif val == best_val:  # If best value is the same, choose best line by depth
+                if best_val > 0 and len(line) + 1 < len(best_line):
                     # If we are winning, choose the smallest depth
-                    best_node = terminal
-                elif best_val < 0 and terminal.depth > best_node.depth:
+                    best_line = (child,) + line
+                elif best_val < 0 and len(line) + 1 > len(best_line):
                     # If we are losing, choose the biggest depth
-                    best_node = terminal
+                    best_line = (child,) + line
 
             alpha = max(alpha, best_val)
 
             # Alpha Beta Pruning
             if beta <= alpha:
+                stats.cutoff(ply, child, index, board)
                 break
 
-        transposition_table[node.state.position] = best_node
-        return best_node, total_expanded
+        if best_line is None:  # The restriction left no move to search, so there is no mate from here
+            stats.exit(ply, move, alpha_original, beta_original, 0)
+            return 0, (), total_expanded
+
+        stats.exit(ply, move, alpha_original, beta_original, best_val, beta <= alpha)
+        return best_val, best_line, total_expanded
 
     else:  # Min Node
         total_expanded = 1
+        stats.expanded += 1
         best_val = math.inf
-        best_node = None
-
-        successors = node.state.find_successors()
-        while not successors.empty():
-            (priority, (action, state)) = successors.get()
-            successor = Node(True, state, node.depth + 1, node, action)
-            terminal, expanded = transposition(successor, alpha, beta)
+        best_line = None
+
+        moves = mate_moves(board, player, mate, heuristic, restriction, stats.skipped, None, move_ordering, ply)
+        for index, child in enumerate(moves):  # Same order as State.find_successors
+            board.push(child)
+            new_mate = mate if board.turn else mate - 1  # decrement mate only if Black moves
+            val, line, expanded = make_unmake_board(board, True, player, new_mate, alpha, beta, restriction, ply + 1,
+                                                    child, heuristic)
+            board.pop()
             total_expanded += expanded
 
-            if terminal.state.utility() < best_val:  # Update the best value and node
-                best_val = terminal.state.utility()
-                best_node = terminal
-            elif terminal.state.utility() == best_val:  # If best value is the same, choose best node by depth
-                if best_val > 0 and terminal.depth > best_node.depth:
+            if val < best_val:  # Update the best value and line
+                best_val = val
+                best_line = (child,) + line
+            elif val == best_val:  # If best value is the same, choose best line by depth
+                if best_val > 0 and len(line) + 1 > len(best_line):
                     # If opponent is losing, choose the biggest depth
-                    best_node = terminal
-                elif best_val < 0 and terminal.depth < best_node.depth:
+                    best_line = (child,) + line
+                elif best_val < 0 and len(line) + 1 < len(best_line):
                     # If opponent is winning, choose the smallest depth
-                    best_node = terminal
+                    best_line = (child,) + line
 
             beta = min(beta, best_val)
 
             # Alpha Beta Pruning
             if beta <= alpha:
+                stats.cutoff(ply, child, index, board)
                 break
 
-        transposition_table[node.state.position] = best_node
-        return best_node, total_expanded
+        stats.exit(ply, move, alpha_original, beta_original, best_val, beta <= alpha)
+        return best_val, best_line, total_expanded
+
+
+transposition_table = TranspositionTable()
 
 
-def killer_move_heuristic(node: Node, alpha, beta, heuristic: Heuristic):
+def transposition(node: Node, alpha, beta, restriction: Restriction = Restriction.NONE,
+                  heuristic: Heuristic = Heuristic.NONE):
     """
-    Minimax algorithm with Alpha-Beta Pruning
+    Minimax algorithm with Alpha-Beta Pruning and Transposition
     :param node: The current Node
     :param alpha: The alpha value of the pruning
     :param beta: The beta value of the pruning
-    :param heuristic: The type of heuristic to use
+    :param restriction: The mate move restriction to use
+    :param heuristic: The move ordering heuristics to use
     :return: The best terminal node and number of states expanded to get there
     """
-    if node.state.position in transposition_table:
-        best_node = deepcopy(transposition_table[node.state.position])
-        pointer = best_node
-        while node.state != pointer.state:
-            pointer = pointer.parent
-        pointer.parent = node.parent
-        return best_node, 0
-    elif node.state.terminal_test():  # Terminal Node
-        return node, 0
-    elif node.is_max_node:  # Max Node
-        total_expanded = 1
+    value, distance, expanded = table_search(node.state, node.is_max_node, alpha, beta, heuristic, restriction,
+                                             node.depth, node.move)
+    return table_path(node, heuristic, restriction, expanded)
+
+
+def killer_move_heuristic(node: Node, alpha, beta, heuristic: Heuristic, restriction: Restriction = Restriction.NONE):
+    """
+    Minimax algorithm with Alpha-Beta Pruning, Transposition and move ordering. With Heuristic.TABLE_MOVE the best
+    move stored in the transposition table is searched first, and with Heuristic.KILLER and Heuristic.HISTORY the
+    quiet moves are ordered by the beta cutoffs of the search. It is the transposition search with move ordering,
+    the heuristic comes before the restriction as it is always given.
+    :param node: The current Node
+    :param alpha: The alpha value of the pruning
+    :param beta: The beta value of the pruning
+    :param heuristic: The move ordering heuristics to use
+    :param restriction: The mate move restriction to use
+    :return: The best terminal node and number of states expanded to get there
+    """
+    return transposition(node, alpha, beta, restriction, heuristic)
+
+
+def table_path(node: Node, heuristic: Heuristic, restriction: Restriction, expanded: int, search=None,
+               window: int = 1):
+    """
+    Rebuilds the best path of a searched node by following the best moves stored in the transposition table. A node
+    whose entry was replaced in the meantime is searched again.
+    :param node: The searched Node
+    :param heuristic: The move ordering heuristics the node was searched with
+    :param restriction: The mate move restriction the node was searched with
+    :param expanded: The number of states expanded by the search
+    :param search: The search that filled the table, default is table_search
+    :param window: The largest value of the search, a node is searched again with the window (-window, window)
+    :return: The best terminal node and number of states expanded to get there
+    """
+    search = search or table_search
+    terminal = node
+    total_expanded = expanded
+    while not terminal.state.terminal_test():
+        state = terminal.state
+        entry = transposition_table.probe(state.key, state.mate)
+        if entry is None:
+            total_expanded += search(state, terminal.is_max_node, -window, window, heuristic, restriction,
+                                     terminal.depth, terminal.move)[2]
+            entry = transposition_table.probe(state.key, state.mate)
+        if entry is None or entry[3] is None:  # The restriction left no move to search, so there is no mate from here
+            break
+        move = entry[3]
+        terminal = Node(not terminal.is_max_node, state.successor(move), terminal.depth + 1, terminal, move)
+
+    return terminal, total_expanded
+
+
+def table_line(node: Node) -> Node:
+    """
+    Follows the best moves stored in the transposition table from a node without searching again
+    :param node: The Node to start from
+    :return: The last node reached, it is a terminal node unless the entry of a node on the way was replaced
+    """
+    terminal = node
+    while not terminal.state.terminal_test():
+        state = terminal.state
+        entry = transposition_table.probe(state.key, state.mate)
+        if entry is None or entry[3] is None:
+            break
+        move = entry[3]
+        terminal = Node(not terminal.is_max_node, state.successor(move), terminal.depth + 1, terminal, move)
+    return terminal
+
+
+def winning_moves(node: Node, heuristic: Heuristic = Heuristic.ALL, restriction: Restriction = Restriction.NONE,
+                  find_all: bool = True) -> (list, int):
+    """
+    Finds the moves of a max node that win, to tell if the checkmate of a puzzle is unique. The node is solved first,
+    then every other move is searched with the null window (0, 1), which only proves or refutes a checkmate, and the
+    transposition table of the solve is reused by these searches.
+    :param node: The current Node, a max node
+    :param heuristic: The move ordering heuristics to use
+    :param restriction: The mate move restriction to use
+    :param find_all: Whether to find every winning move, otherwise the search stops at the second one
+    :return: The winning moves, the best move first, and number of states expanded to find them
+    """
+    state = node.state
+    if state.terminal_test():
+        return [], 0
+    value, distance, expanded = table_search(state, True, -1, 1, heuristic, restriction, node.depth, node.move)
+    entry = transposition_table.probe(state.key, state.mate)
+    if value < 1 or entry is None:  # There is no checkmate, so no move wins
+        return [], expanded
+
+    moves = [entry[3]]
+    for move, successor in state.find_successors(heuristic, restriction, stats.skipped, None, move_ordering,
+                                                 node.depth):
+        if move == moves[0]:
+            continue
+        val, distance, searched = table_search(successor, False, 0, 1, heuristic, restriction, node.depth + 1, move)
+        expanded += searched
+        if val >= 1:  # Another checkmate
+            moves.append(move)
+            if not find_all:
+                break
+
+    return moves, expanded
+
+
+def table_search(state: State, is_max_node: bool, alpha, beta, heuristic: Heuristic, restriction: Restriction,
+                 ply: int = 0, move: chess.Move = None) -> (int, int, int):
+    """
+    Minimax algorithm with Alpha-Beta Pruning and Transposition, the transposition table stores the value, the
+    distance to the terminal position and the best move of every searched state
+    :param state: The current State
+    :param is_max_node: Whether the current state is a max node or min node
+    :param alpha: The alpha value of the pruning
+    :param beta: The beta value of the pruning
+    :param heuristic: The move ordering heuristics to use
+    :param restriction: The mate move restriction to use
+    :param ply: The depth of the state
+    :param move: The move that leads to the state
+    :return: The best utility, the number of moves to the best terminal state and number of states expanded
+    """
+    stats.enter(ply, move, alpha, beta)
+    entry = transposition_table.probe(state.key, state.mate)
+    if entry is not None:
+        bound, value, distance = entry[:3]
+        if (bound == Bound.EXACT or (bound == Bound.LOWER and value >= beta) or
+                (bound == Bound.UPPER and value <= alpha)):
+            stats.exit(ply, move, alpha, beta, value, table_hit=True)
+            return value, distance, 0
+
+    if state.terminal_test():  # Terminal State
+        value = state.utility()
+        stats.exit(ply, move, alpha, beta, value)
+        return value, 0, 0
+
+    alpha_original, beta_original = alpha, beta
+    first = transposition_table.best_move(state.key) if heuristic & Heuristic.TABLE_MOVE else None
+    total_expanded = 1
+    stats.expanded += 1
+    best_move = None
+
+    if is_max_node:  # Max Node
         best_val = -math.inf
-        best_node = None
+        best_distance = 0
 
-        successors = node.state.find_successors(heuristic)
-        while not successors.empty():
-            (priority, (action, state)) = successors.get()
-            n = Node(False, state, node.depth + 1, node, action)
-            terminal, expanded = killer_move_heuristic(n, alpha, beta, heuristic)
+        for index, (child, successor) in enumerate(state.find_successors(heuristic, restriction, stats.skipped,
+                                                                         first, move_ordering, ply)):
+            val, distance, expanded = table_search(successor, False, alpha, beta, heuristic, restriction, ply + 1,
+                                                   child)
             total_expanded += expanded
+            distance += 1
 
-            if terminal.state.utility() > best_val:  # Update the best value and node
-                best_val = terminal.state.utility()
-                best_node = terminal
-            elif terminal.state.utility() == best_val:  # If best value is the same, choose best node by depth
-                if best_val > 0 and terminal.depth < best_node.depth:
+            if val > best_val:  # Update the best value and move
+                best_val, best_distance, best_move = val, distance, child
+            elif val == best_val:  # If best value is the same, choose best move by depth
+                if best_val > 0 and distance < best_distance:
                     # If we are winning, choose the smallest depth
-                    best_node = terminal
-                elif best_val < 0 and terminal.depth > best_node.depth:
+                    best_distance, best_move = distance, child
+                elif best_val < 0 and distance > best_distance:
                     # If we are losing, choose the biggest depth
-                    best_node = terminal
+                    best_distance, best_move = distance, child
 
             alpha = max(alpha, best_val)
 
             # Alpha Beta Pruning
             if beta <= alpha:
+                stats.cutoff(ply, child, index, state.board)
                 break
 
-        transposition_table[node.state.position] = best_node
-        return best_node, total_expanded
+        if best_move is None:  # The restriction left no move to search, so there is no mate from here
+            transposition_table.store(state.key, state.mate, Bound.EXACT, 0, 0, None)
+            stats.exit(ply, move, alpha_original, beta_original, 0)
+            return 0, 0, total_expanded
 
     else:  # Min Node
-        total_expanded = 1
         best_val = math.inf
-        best_node = None
+        best_distance = 0
 
-        successors = node.state.find_successors(heuristic)
-        while not successors.empty():
-            (priority, (action, state)) = successors.get()
-            successor = Node(True, state, node.depth + 1, node, action)
-            terminal, expanded = killer_move_heuristic(successor, alpha, beta, heuristic)
+        for index, (child, successor) in enumerate(state.find_successors(heuristic, restriction, stats.skipped,
+                                                                         first, move_ordering, ply)):
+            val, distance, expanded = table_search(successor, True, alpha, beta, heuristic, restriction, ply + 1,
+                                                   child)
             total_expanded += expanded
+            distance += 1
 
-            if terminal.state.utility() < best_val:  # Update the best value and node
-                best_val = terminal.state.utility()
-                best_node = terminal
-            elif terminal.state.utility() == best_val:  # If best value is the same, choose best node by depth
-                if best_val > 0 and terminal.depth > best_node.depth:
+            if val < best_val:  # Update the best value and move
+                best_val, best_distance, best_move = val, distance, child
+            elif val == best_val:  # If best value is the same, choose best move by depth
+                if best_val > 0 and distance > best_distance:
                     # If opponent is losing, choose the biggest depth
-                    best_node = terminal
-                elif best_val < 0 and terminal.depth < best_node.depth:
+                    best_distance, best_move = distance, child
+                elif best_val < 0 and distance < best_distance:
                     # If opponent is winning, choose the smallest depth
-                    best_node = terminal
+                    best_distance, best_move = distance, child
 
             beta = min(beta, best_val)
 
             # Alpha Beta Pruning
             if beta <= alpha:
+                stats.cutoff(ply, child, index, state.board)
                 break
 
-        transposition_table[node.state.position] = best_node
-        return best_node, total_expanded
+    if best_val <= alpha_original:
+        bound = Bound.UPPER
+    elif best_val >= beta_original:
+        bound = Bound.LOWER
+    else:
+        bound = Bound.EXACT
+    transposition_table.store(state.key, state.mate, bound, best_val, best_distance, best_move)
+    stats.exit(ply, move, alpha_original, beta_original, best_val, beta <= alpha)
+    return best_val, best_distance, total_expanded
+
+
+def iterative_deepening(node: Node, heuristic: Heuristic, restriction: Restriction = Restriction.NONE):
+    """
+    Iterative Deepening over the checkmate depth, it searches for a checkmate in 1, then in 2 and so on up to the
+    checkmate depth of the node, and stops at the first depth with a checkmate. The transposition table is kept
+    between the iterations, so their results and best moves are reused by the deeper ones.
+    :param node: The current Node
+    :param heuristic: The type of heuristic to use
+    :param restriction: The mate move restriction to use
+    :return: The best terminal node and number of states expanded to get there
+    """
+    total_expanded = 0
+    state = node.state
+    for mate in range(1, state.mate + 1):
+        root = Node(node.is_max_node, State(state.player, state.position, mate, state.key), node.depth, node.parent,
+                    node.move)
+        transposition_table.new_search()  # The entries of shallower iterations are replaced first
+        terminal, expanded = killer_move_heuristic(root, -1, 1, heuristic, restriction)
+        total_expanded += expanded
+
+        if terminal.state.utility() == 1:  # The shortest checkmate is found
+            break
+        stats.proven_depth = mate  # An aborted deeper iteration still leaves this proven
+
+    return terminal, total_expanded
+
+
+MATE_SCORE = 1000  # Score of a checkmate at the initial node, every ply to the checkmate lowers it by one
+MATE_BOUND = MATE_SCORE - 0xff  # Scores beyond this bound are checkmates
+
+
+def mate_score(utility: int, ply: int) -> int:
+    """
+    Scores a terminal state by the distance to its checkmate
+    :param utility: The utility of the terminal state
+    :param ply: The depth of the terminal state
+    :return: The score, shorter checkmates of the player score higher and shorter checkmates of the opponent lower
+    """
+    if utility > 0:
+        return MATE_SCORE - ply
+    elif utility < 0:
+        return ply - MATE_SCORE
+    return 0
+
+
+def score_to_table(value: int, ply: int) -> int:
+    """
+    Converts a checkmate score from the distance to the initial node to the distance to the state, so the
+    transposition table entry holds for the state at any depth
+    :param value: The score of the state
+    :param ply: The depth of the state
+    :return: The score to store
+    """
+    if value > MATE_BOUND:
+        return value + ply
+    elif value < -MATE_BOUND:
+        return value - ply
+    return value
+
+
+def score_from_table(value: int, ply: int) -> int:
+    """
+    Converts a checkmate score stored by score_to_table back to the distance to the initial node
+    :param value: The stored score
+    :param ply: The depth of the state
+    :return: The score of the state
+    """
+    if value > MATE_BOUND:
+        return value - ply
+    elif value < -MATE_BOUND:
+        return value + ply
+    return value
+
+
+def principal_variation(node: Node, heuristic: Heuristic = Heuristic.ALL, restriction: Restriction = Restriction.NONE):
+    """
+    Principal Variation Search with checkmates scored by their distance. Only the first move of a node is searched
+    with the full window, the other moves are searched with a null window and searched again only when they beat it,
+    and mate-distance pruning cuts every subtree that cannot beat a shorter checkmate found already.
+    :param node: The current Node
+    :param heuristic: The move ordering heuristics to use
+    :param restriction: The mate move restriction to use
+    :return: The best terminal node and number of states expanded to get there
+    """
+    value, distance, expanded = pvs_search(node.state, node.is_max_node, -MATE_SCORE, MATE_SCORE, heuristic,
+                                           restriction, node.depth, node.move)
+    return table_path(node, heuristic, restriction, expanded, pvs_search, MATE_SCORE)
+
+
+def record_checkmate(state: State, ply: int, move: chess.Move, successor: State) -> None:
+    """
+    Keeps a checkmate found at the initial node in search.stats, the line is followed in the transposition table
+    :param state: The State of the initial node
+    :param ply: The depth of the initial node
+    :param move: The move that gives the checkmate
+    :param successor: The State reached by the move
+    """
+    root = Node(True, state, ply)
+    terminal = table_line(Node(False, successor, ply + 1, root, move))
+    if terminal.state.terminal_test() and terminal.state.utility() == 1:
+        stats.proven = terminal
+
+
+def pvs_search(state: State, is_max_node: bool, alpha, beta, heuristic: Heuristic, restriction: Restriction,
+               ply: int = 0, move: chess.Move = None) -> (int, int, int):
+    """
+    Principal Variation Search with Transposition, the values are checkmate scores of mate_score
+    :param state: The current State
+    :param is_max_node: Whether the current state is a max node or min node
+    :param alpha: The alpha value of the pruning
+    :param beta: The beta value of the pruning
+    :param heuristic: The move ordering heuristics to use
+    :param restriction: The mate move restriction to use
+    :param ply: The depth of the state
+    :param move: The move that leads to the state
+    :return: The best score, the number of moves to the best terminal state and number of states expanded
+    """
+    stats.enter(ply, move, alpha, beta)
+    entry = transposition_table.probe(state.key, state.mate)
+    if entry is not None:
+        bound, value, distance = entry[:3]
+        value = score_from_table(value, ply)
+        if (bound == Bound.EXACT or (bound == Bound.LOWER and value >= beta) or
+                (bound == Bound.UPPER and value <= alpha)):
+            stats.exit(ply, move, alpha, beta, value, table_hit=True)
+            return value, distance, 0
+
+    if state.terminal_test():  # Terminal State
+        value = mate_score(state.utility(), ply)
+        stats.exit(ply, move, alpha, beta, value)
+        return value, 0, 0
+
+    # Mate-Distance Pruning: a checkmate is given by a move of the side giving it, so below this state the player
+    # cannot give a checkmate sooner than on their next move, and neither can the opponent
+    alpha_original, beta_original = alpha, beta
+    alpha = max(alpha, ply + (2 if is_max_node else 1) - MATE_SCORE)
+    beta = min(beta, MATE_SCORE - ply - (1 if is_max_node else 2))
+    if alpha >= beta:
+        stats.exit(ply, move, alpha_original, beta_original, alpha, True)
+        return alpha, 0, 0
+
+    first = transposition_table.best_move(state.key) if heuristic & Heuristic.TABLE_MOVE else None
+    total_expanded = 1
+    stats.expanded += 1
+    best_move = None
+
+    if is_max_node:  # Max Node
+        best_val = -math.inf
+        best_distance = 0
+
+        for index, (child, successor) in enumerate(state.find_successors(heuristic, restriction, stats.skipped,
+                                                                         first, move_ordering, ply)):
+            if index == 0 or beta - alpha <= 1:  # The principal variation is searched with the full window
+                val, distance, expanded = pvs_search(successor, False, alpha, beta, heuristic, restriction, ply + 1,
+                                                     child)
+            else:  # Prove the move is no better than alpha with a null window
+                val, distance, expanded = pvs_search(successor, False, alpha, alpha + 1, heuristic, restriction,
+                                                     ply + 1, child)
+                if alpha < val < beta:  # The move is better, search it again for its exact score
+                    total_expanded += expanded
+                    val, distance, expanded = pvs_search(successor, False, val, beta, heuristic, restriction,
+                                                         ply + 1, child)
+            total_expanded += expanded
+            distance += 1
+
+            if val > best_val:  # Update the best value and move, the score already prefers shorter checkmates
+                best_val, best_distance, best_move = val, distance, child
+                if move is None and val > MATE_BOUND:  # Kept in case the search is aborted before it ends
+                    record_checkmate(state, ply, child, successor)
+
+            alpha = max(alpha, best_val)
+
+            # Alpha Beta Pruning
+            if beta <= alpha:
+                stats.cutoff(ply, child, index, state.board)
+                break
+
+        if best_move is None:  # The restriction left no move to search, so there is no mate from here
+            transposition_table.store(state.key, state.mate, Bound.EXACT, 0, 0, None)
+            stats.exit(ply, move, alpha_original, beta_original, 0)
+            return 0, 0, total_expanded
+
+    else:  # Min Node
+        best_val = math.inf
+        best_distance = 0
+
+        for index, (child, successor) in enumerate(state.find_successors(heuristic, restriction, stats.skipped,
+                                                                         first, move_ordering, ply)):
+            if index == 0 or beta - alpha <= 1:  # The principal variation is searched with the full window
+                val, distance, expanded = pvs_search(successor, True, alpha, beta, heuristic, restriction, ply + 1,
+                                                     child)
+            else:  # Prove the move is no better than beta with a null window
+                val, distance, expanded = pvs_search(successor, True, beta - 1, beta, heuristic, restriction,
+                                                     ply + 1, child)
+                if alpha < val < beta:  # The move is better, search it again for its exact score
+                    total_expanded += expanded
+                    val, distance, expanded = pvs_search(successor, True, alpha, val, heuristic, restriction,
+                                                         ply + 1, child)
+            total_expanded += expanded
+            distance += 1
+
+            if val < best_val:  # Update the best value and move, the score already prefers longer checkmates
+                best_val, best_distance, best_move = val, distance, child
+
+            beta = min(beta, best_val)
+
+            # Alpha Beta Pruning
+            if beta <= alpha:
+                stats.cutoff(ply, child, index, state.board)
+                break
+
+    if best_val <= alpha_original:
+        bound = Bound.UPPER
+    elif best_val >= beta_original:
+        bound = Bound.LOWER
+    else:
+        bound = Bound.EXACT
+    transposition_table.store(state.key, state.mate, bound, score_to_table(best_val, ply), best_distance, best_move)
+    stats.exit(ply, move, alpha_original, beta_original, best_val, beta <= alpha)
+    return best_val, best_distance, total_expanded
+
+
+class ProofNode:
+    def __init__(self, node: Node, parent: 'ProofNode' = None):
+        """
+        Initialises a node of the proof-number search tree
+        :param node: The search Node
+        :param parent: The parent in the proof-number search tree
+        """
+        self.node = node
+        self.parent = parent
+        self.children = []
+        self.distance = 0  # Number of moves to the terminal nodes that solved this node
+        self.value = 0  # The utility of the terminal nodes that solved this node
+        if node.state.terminal_test():  # A terminal node is solved right away
+            self.value = node.state.utility()
+            if node.state.utility() == 1:
+                self.proof, self.disproof = 0, math.inf
+            else:
+                self.proof, self.disproof = math.inf, 0
+        else:
+            self.proof, self.disproof = 1, 1
+
+    def update(self) -> None:
+        """
+        Sets the proof and disproof numbers from the children. Once the node is solved, only the children needed to
+        show it are kept.
+        """
+        children = self.children
+        if not children:  # The restriction left no move to search, so there is no mate from here
+            self.proof, self.disproof = math.inf, 0
+            self.distance = self.value = 0
+            return
+        elif self.node.is_max_node:  # OR Node, one child has to be proved
+            self.proof = min(child.proof for child in children)
+            self.disproof = sum(child.disproof for child in children)
+        else:  # AND Node, every child has to be proved
+            self.proof = sum(child.proof for child in children)
+            self.disproof = min(child.disproof for child in children)
+
+        if self.proof == 0 and self.node.is_max_node:  # Keep the shortest proved move
+            best = min((child for child in children if child.proof == 0), key=lambda child: child.distance)
+            self.children = [best]
+            self.distance = best.distance + 1
+            self.value = 1
+        elif self.disproof == 0 and not self.node.is_max_node:  # Keep the worst disproved move for the player
+            worst = min((child for child in children if child.disproof == 0), key=lambda child: child.value)
+            self.children = [worst]
+            self.distance = worst.distance + 1
+            self.value = worst.value
+        elif self.proof == 0 or self.disproof == 0:  # Every child is solved the same way
+            self.distance = max(child.distance for child in children) + 1
+            self.value = max(child.value for child in children)
+
+
+def proof_number(node: Node, restriction: Restriction = Restriction.NONE, heuristic: Heuristic = Heuristic.CHECK):
+    """
+    Proof-Number Search, it always expands the most-proving node, the leaf that is cheapest to prove or disprove the
+    checkmate
+    :param node: The current Node
+    :param restriction: The mate move restriction to use
+    :param heuristic: The move ordering heuristics to use, they decide which of equally proving children comes first
+    :return: The best terminal node and number of states expanded to get there
+    """
+    root = ProofNode(node)
+    total_expanded = 0
+
+    while root.proof != 0 and root.disproof != 0:
+        most_proving = root
+        while most_proving.children:  # Select the most-proving node
+            if most_proving.node.is_max_node:
+                most_proving = min(most_proving.children, key=lambda child: child.proof)
+            else:
+                most_proving = min(most_proving.children, key=lambda child: child.disproof)
+
+        current, leaf = most_proving.node, most_proving
+        stats.enter(current.depth, current.move, -math.inf, math.inf)
+        for move, state in current.state.find_successors(heuristic, restriction, stats.skipped,
+                                                         ordering=move_ordering, ply=current.depth):
+            successor = Node(not current.is_max_node, state, current.depth + 1, current, move)
+            most_proving.children.append(ProofNode(successor, most_proving))
+        total_expanded += 1
+        stats.expanded += 1
+
+        while most_proving is not None:  # Update the ancestors up to the root
+            most_proving.update()
+            most_proving = most_proving.parent
+        stats.exit(current.depth, current.move, -math.inf, math.inf, 1 if leaf.proof == 0 else 0)
+
+    best = root
+    while best.children:  # Follow the proof or disproof down to its terminal node
+        if best.node.is_max_node and best.proof == 0:
+            best = min(best.children, key=lambda child: (child.proof, child.distance))
+        elif best.node.is_max_node:  # No checkmate, avoid the moves that lose
+            best = max(best.children, key=lambda child: (child.value, child.distance))
+        else:
+            best = max(best.children, key=lambda child: (child.proof == 0, child.distance))
+
+    return best.node, total_expanded
@@ -0,0 +1,217 @@
+import argparse
+import heapq
+import json
+import struct
+from array import array
+from collections import Counter
+from typing import Iterator
+
+import chess
+
+import puzzleloader
+from ttable import pack_move, unpack_move
+
+TRACE_MAGIC = b'CMST'  # The first bytes of every trace file
+TRACE_VERSION = 1
+RECORD = struct.Struct('<HBBhhh')  # The packed move, ply, flags, alpha, beta and value of a node
+CUTOFF = 1  # Flag of a node whose search was cut off
+TABLE_HIT = 2  # Flag of a node whose value came from the transposition table
+SCORE_LIMIT = 0x7fff  # Values beyond 16 bits, like infinite alpha and beta, are clamped to it
+
+
+def clamp(value) -> int:
+    """
+    Clamps a value of the search to 16 bits
+    :param value: An alpha, beta or node value, it may be infinite
+    :return: The value as a 16 bit integer
+    """
+    if value >= SCORE_LIMIT:
+        return SCORE_LIMIT
+    elif value <= -SCORE_LIMIT:
+        return -SCORE_LIMIT
+    return int(value)
+
+
+class SearchTrace:
+    """
+    Writes every node a search exits to a compact binary trace file, one record of 10 bytes per node. It is
+    registered as an exit callback of the search statistics, the records are buffered and written in blocks. The
+    nodes are written in the order the search leaves them, so the children of a node come right before it.
+    """
+    BUFFER_SIZE = 1 << 16  # Number of bytes buffered before they are written
+
+    def __init__(self, path: str):
+        """
+        Creates a trace file
+        :param path: The filename of the trace
+        """
+        self.file = open(path, 'wb')
+        self.file.write(TRACE_MAGIC + bytes((TRACE_VERSION,)))
+        self.buffer = bytearray()
+        self.records = 0
+
+    def __call__(self, ply: int, move: chess.Move, alpha, beta, value, cutoff: bool = False,
+                 table_hit: bool = False) -> None:
+        """
+        Records a node the search exits
+        :param ply: The depth of the node
+        :param move: The move that leads to the node
+        :param alpha: The alpha value the node was entered with
+        :param beta: The beta value the node was entered with
+        :param value: The value of the node
+        :param cutoff: Whether the search of the node was cut off
+        :param table_hit: Whether the value came from the transposition table
+        """
+        self.buffer += RECORD.pack(pack_move(move), min(ply, 0xff), cutoff | table_hit << 1, clamp(alpha),
+                                   clamp(beta), clamp(value))
+        self.records += 1
+        if len(self.buffer) >= self.BUFFER_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered records to the file
+        """
+        self.file.write(self.buffer)
+        self.buffer = bytearray()
+
+    def close(self) -> None:
+        """
+        Writes the remaining records and closes the file
+        """
+        self.flush()
+        self.file.close()
+
+
+def read_trace(path: str) -> Iterator[tuple]:
+    """
+    Reads the records of a trace file
+    :param path: The filename of the trace
+    :return: An iterator of the packed move, ply, flags, alpha, beta and value of every node
+    """
+    with open(path, 'rb') as f:
+        header = f.read(len(TRACE_MAGIC) + 1)
+        if header[:len(TRACE_MAGIC)] != TRACE_MAGIC:
+            raise ValueError(path + " is not a search trace")
+        if header[len(TRACE_MAGIC)] != TRACE_VERSION:
+            raise ValueError(path + " is a trace of version " + str(header[len(TRACE_MAGIC)]))
+        while block := f.read(RECORD.size * 4096):
+            yield from RECORD.iter_unpack(block[:len(block) - len(block) % RECORD.size])
+
+
+def summarize_trace(path: str, top: int = 5, plies: int = 3) -> dict:
+    """
+    Summarises a trace of a depth-first search. The tree is rebuilt from the order of the records: when a node is
+    read, the nodes deeper than it that were not claimed yet are its children.
+    :param path: The filename of the trace
+    :param top: The number of hottest subtrees to report at every ply
+    :param plies: The number of plies below the initial node to report the hottest subtrees of
+    :return: A dictionary of the summary, the nodes and the average number of children by ply, the cutoffs and
+    table hits, the nodes searched before the moves that caused cutoffs, in total and by the ply of the node that was
+    cut off, where the nodes of nested cutoffs count at every ply, and the largest subtrees with their lines
+    """
+    moves = array('H')
+    parents = array('q')  # The index of the parent of every record, -1 until it is read
+    in_vain = bytearray()  # Whether a record is a child searched before the move that caused the cutoff
+    nodes_by_ply = Counter()
+    interior_by_ply = Counter()  # Nodes with at least one child
+    children_by_ply = Counter()
+    wasted_by_ply = Counter()  # Nodes searched before the move that caused the cutoff
+    cutoffs = table_hits = 0
+    hottest = {}  # A heap of the largest subtrees by ply
+    stack = []  # The index, ply and size of the subtrees whose parent was not read yet
+
+    for index, (move, ply, flags, alpha, beta, value) in enumerate(read_trace(path)):
+        moves.append(move)
+        parents.append(-1)
+        in_vain.append(0)
+        nodes_by_ply[ply] += 1
+        cutoffs += flags & CUTOFF
+        table_hits += flags & TABLE_HIT and 1
+
+        size = 1
+        children = []
+        while stack and stack[-1][1] > ply:
+            child, child_ply, child_size = stack.pop()
+            parents[child] = index
+            if flags & CUTOFF and children:  # The last child read caused the cutoff, the others were searched in vain
+                in_vain[child] = 1
+            children.append(child_size)
+            size += child_size
+        if children:
+            interior_by_ply[ply] += 1
+            children_by_ply[ply] += len(children)
+            if flags & CUTOFF:
+                wasted_by_ply[ply] += size - 1 - children[0]
+        stack.append((index, ply, size))
+
+        if 0 < ply <= plies:
+            heap = hottest.setdefault(ply, [])
+            if len(heap) < top:
+                heapq.heappush(heap, (size, index, value))
+            elif size > heap[0][0]:
+                heapq.heapreplace(heap, (size, index, value))
+
+    def line(index: int) -> list:
+        moves_of_line = []
+        while index >= 0:
+            if moves[index]:
+                moves_of_line.append(unpack_move(moves[index]).uci())
+            index = parents[index]
+        moves_of_line.reverse()
+        return moves_of_line
+
+    for index in reversed(range(len(parents))):  # Parents come after their children, so the root goes first
+        if parents[index] >= 0 and in_vain[parents[index]]:
+            in_vain[index] = 1
+
+    depths = range(max(nodes_by_ply, default=-1) + 1)
+    return {
+        'nodes': len(moves),
+        'nodes_by_ply': [nodes_by_ply[ply] for ply in depths],
+        'branching_by_ply': [children_by_ply[ply] / interior_by_ply[ply] if interior_by_ply[ply] else 0.0
+                             for ply in depths],
+        'cutoffs': cutoffs,
+        'table_hits': table_hits,
+        'wasted_before_cutoffs': sum(in_vain),
+        'wasted_by_ply': [wasted_by_ply[ply] for ply in depths],
+        'hottest': {ply: [{'line': line(index), 'nodes': size, 'value': value}
+                          for size, index, value in sorted(heap, reverse=True)]
+                    for ply, heap in sorted(hottest.items())},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record and summarise traces of the search tree")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help="Solve one puzzle and write the trace of its search")
+    record.add_argument('file', help="The puzzle file")
+    record.add_argument('-i', '--index', type=int, default=0, help="The index of the puzzle in the file")
+    record.add_argument('-a', '--algorithm', default='KILLER_MOVE_HEURISTIC', help="The name of the search algorithm")
+    record.add_argument('-r', '--restriction', default='NONE', help="The name of the mate move restriction")
+    record.add_argument('-o', '--output', default='search.trace', help="The file to write the trace to")
+
+    summary = commands.add_parser('summary', help="Summarise a trace")
+    summary.add_argument('trace', help="The trace file")
+    summary.add_argument('-n', '--top', type=int, default=5, help="The number of hottest subtrees of every ply")
+    summary.add_argument('-p', '--plies', type=int, default=3, help="The plies to report the hottest subtrees of")
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        from main import SearchAlgorithm, result_status, run_search  # Imported here as main imports this module
+        from search import stats
+        from state import Restriction, State
+
+        index, puzzle = next(puzzleloader.iter_puzzles(args.file, start=args.index, stop=args.index + 1))
+        terminal, expanded = run_search(State(puzzle['player'], puzzle['position'], puzzle['mate']),
+                                        SearchAlgorithm[args.algorithm], Restriction[args.restriction],
+                                        trace=args.output)
+        print(result_status(terminal, stats).capitalize() + ":", str(terminal), expanded, "states, trace written to",
+              args.output)
+    else:
+        print(json.dumps(summarize_trace(args.trace, args.top, args.plies), indent=1))
+
+
+if __name__ == '__main__':
+    main()
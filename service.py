@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+
+import batch
+import search
+from budget import Budget
+from main import SearchAlgorithm, result_status, run_search
+from state import Restriction, State
+
+
+def solve_request(request: dict) -> dict:
+    """
+    Solves a single solve request, this runs inside a worker process
+    :param request: A dictionary with the FEN 'position' and the checkmate depth 'mate', and optionally the 'id' of
+    the request, the 'player' to solve for (the side to move by default), the 'algorithm', the 'restriction', the
+    'time_limit' in seconds and the 'node_limit'
+    :return: A dictionary of the result, or of the error if the request is invalid
+    """
+    try:
+        position = request['position']
+        board = chess.Board(position)
+        player = request.get('player', board.turn)
+        if isinstance(player, str):  # 'w' or 'b' like in a FEN
+            player = player.lower() in ('w', 'white')
+        search_type = SearchAlgorithm[request.get('algorithm', SearchAlgorithm.KILLER_MOVE_HEURISTIC.name)]
+        restriction = Restriction[request.get('restriction', Restriction.NONE.name)]
+        initial_state = State(player, position, int(request['mate']))
+    except (KeyError, ValueError, TypeError) as error:
+        return {'id': request.get('id'), 'error': type(error).__name__ + ": " + str(error)}
+
+    budget = None
+    if request.get('time_limit') is not None or request.get('node_limit') is not None:
+        budget = Budget(request.get('time_limit'), request.get('node_limit'))
+
+    start = time.perf_counter()
+    terminal, expanded = run_search(initial_state, search_type, restriction, cache=batch.cache, budget=budget)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'id': request.get('id'),
+        'status': result_status(terminal, search.stats),
+        'path': terminal.path(),
+        'utility': terminal.state.utility(),
+        'expanded': expanded,
+        'time': elapsed,
+    }
+
+
+def warm_up() -> int:
+    """
+    Does nothing, it is submitted once per worker so every worker process is started before the first request
+    :return: The process id of the worker
+    """
+    return os.getpid()
+
+
+class SolverService:
+    """
+    A long-running solver, it reads solve requests as JSON lines, dispatches them to a pool of warm worker processes
+    and writes every result as a JSON line as soon as it is solved
+    """
+
+    def __init__(self, workers: int = None, cache_path: str = None):
+        """
+        Initialises the service and starts its worker processes
+        :param workers: The number of worker processes, default is the number of CPUs
+        :param cache_path: The filename of a solution cache shared by the workers, default is no cache
+        """
+        workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(workers, initializer=batch.init_worker, initargs=(cache_path,))
+        for future in [self.executor.submit(warm_up) for _ in range(workers)]:
+            future.result()
+
+    async def solve(self, line: str) -> str:
+        """
+        Solves one request line on the worker pool
+        :param line: The JSON line of the request
+        :return: The JSON line of the result
+        """
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            return json.dumps({'id': None, 'error': "JSONDecodeError: " + str(error)})
+        if not isinstance(request, dict):
+            return json.dumps({'id': None, 'error': "A request has to be a JSON object"})
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, solve_request, request)
+        except Exception as error:  # A failed request must not stop the service
+            result = {'id': request.get('id'), 'error': type(error).__name__ + ": " + str(error)}
+        return json.dumps(result)
+
+    async def serve(self, readline, write) -> None:
+        """
+        Solves every request of a stream concurrently, the results are written in the order they are solved
+        :param readline: An awaitable function that reads the next request line, empty at the end of the stream
+        :param write: A function that writes a result line
+        """
+        async def respond(line: str) -> None:
+            write(await self.solve(line))
+
+        tasks = set()
+        while line := await readline():
+            if line.strip():
+                task = asyncio.create_task(respond(line.decode()))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def serve_stdin(self) -> None:
+        """
+        Serves the requests of the standard input until it is closed
+        """
+        loop = asyncio.get_running_loop()
+
+        def readline():  # Read in a thread, the standard input may be a file instead of a pipe
+            return loop.run_in_executor(None, sys.stdin.buffer.readline)
+
+        def write(line: str) -> None:
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+
+        await self.serve(readline, write)
+
+    async def serve_socket(self, path: str) -> None:
+        """
+        Serves the requests of every connection to a Unix socket, the results of a connection are written back to it
+        :param path: The path of the Unix socket
+        """
+        async def connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            await self.serve(reader.readline, lambda line: writer.write(line.encode() + b'\n'))
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_unix_server(connection, path)
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        """
+        Stops the worker processes
+        """
+        self.executor.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve solve requests as JSON lines on a pool of warm workers")
+    parser.add_argument('-s', '--socket', default=None,
+                        help="The path of a Unix socket to listen on, default is the standard input and output")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="The number of worker processes, default is the number of CPUs")
+    parser.add_argument('-c', '--cache', default=None, help="A solution cache file to reuse earlier solutions")
+    args = parser.parse_args()
+
+    service = SolverService(args.workers, args.cache)
+    try:
+        if args.socket is None:
+            asyncio.run(service.serve_stdin())
+        else:
+            asyncio.run(service.serve_socket(args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
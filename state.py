@@ -1,30 +1,195 @@
-import queue
-from enum import Enum
+from collections import Counter
+from enum import Enum, IntFlag
+from typing import Iterator
 
 import chess
 
+import zobrist
 
-class Heuristic(Enum):
+
+class Heuristic(IntFlag):
+    """
+    Heuristic Enumerations, the move ordering heuristics can be combined
+    """
+    NONE = 0  # Captures before quiet moves
+    CHECK = 1  # Checking moves first
+    KILLER = 2  # Quiet moves that caused a beta cutoff at the same ply before the other quiet moves
+    HISTORY = 4  # Quiet moves ordered by how often they caused beta cutoffs
+    MVV_LVA = 8  # Captures ordered by the most valuable victim, then the least valuable attacker
+    TABLE_MOVE = 16  # The best move stored in the transposition table before every other move
+    ALL = CHECK | KILLER | HISTORY | MVV_LVA | TABLE_MOVE
+
+
+class Restriction(Enum):
+    """
+    Mate Move Restriction Enumerations
+    """
+    NONE = 0  # Every legal move is searched
+    FINAL_CHECKS = 1  # Only checking moves at the final move of the player
+    CHECKS_FIRST = 2  # Only checking moves at the final move, and checking moves first at the earlier moves
+
+
+def board_utility(board: chess.Board, player: bool) -> int:
+    """
+    Gets the utility value of a terminal chess position
+    :param board: The chess board
+    :param player: The player to get the utility for, True for WHITE and False for BLACK
+    :return: +1 if player won the game, -1 if player lost the game or 0 if the game is draw or not over
+    """
+    outcome = board.outcome()
+    if outcome and outcome.winner is not None:  # If white won
+        return 1 if outcome.winner == player else -1
+    else:
+        return 0
+
+
+def capture_order(board: chess.Board, move: chess.Move) -> tuple:
+    """
+    Gets the MVV-LVA sort key of a capture
+    :param board: The chess board
+    :param move: A capturing move of the board
+    :return: A key that sorts the most valuable victims first, then the least valuable attackers
+    """
+    victim = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+    return -victim, board.piece_type_at(move.from_square)
+
+
+def staged_moves(board: chess.Board, checks_first: bool = False, checks_only: bool = False,
+                 skipped: Counter = None, first: chess.Move = None, mvv_lva: bool = False, killers: tuple = (),
+                 history=None) -> Iterator[chess.Move]:
+    """
+    Lazily generates the legal moves in stages: checking moves, captures, killer moves, then quiet moves. A move is
+    yielded as soon as its stage comes up, so nothing more is generated when the caller stops early.
+    :param board: The chess board, it must be the same position whenever the generator resumes
+    :param checks_first: Whether checking moves form the first stage
+    :param checks_only: Whether only the checking moves are generated
+    :param skipped: A counter of the moves left out by checks_only, or held back by checks_first and never generated
+    :param first: A move to generate before every stage, if it is legal
+    :param mvv_lva: Whether the captures are ordered by the most valuable victim, then the least valuable attacker
+    :param killers: Quiet moves to generate before the other quiet moves, if they are legal
+    :param history: A function of a move that scores quiet moves, higher scores are generated first
+    :return: An iterator of the legal moves
     """
-    Heuristic Enumerations
+    checks_first = checks_first or checks_only
+    captures = []
+    quiets = []
+    checks_done = False
+    try:
+        if first is not None and board.is_legal(first) and (not checks_only or board.gives_check(first)):
+            yield first
+        for move in board.legal_moves:
+            if move == first:
+                continue
+            elif checks_first and board.gives_check(move):
+                yield move
+            elif board.is_capture(move):
+                if checks_first or mvv_lva:
+                    captures.append(move)
+                else:
+                    yield move
+            else:
+                quiets.append(move)
+        checks_done = True
+
+        if not checks_only:
+            if mvv_lva:
+                captures.sort(key=lambda capture: capture_order(board, capture))
+            yield from captures
+            for killer in killers:
+                if killer in quiets:
+                    quiets.remove(killer)
+                    yield killer
+            if history is not None:
+                quiets.sort(key=history, reverse=True)
+            yield from quiets
+    finally:
+        if skipped is not None and checks_only:  # The moves that are not checks are never searched
+            skipped[Restriction.FINAL_CHECKS] += len(captures) + len(quiets)
+        elif skipped is not None and checks_first and not checks_done:  # Stopped while searching the checks
+            skipped[Restriction.CHECKS_FIRST] += len(captures) + len(quiets)
+
+
+def mate_moves(board: chess.Board, player: bool, mate: int, heuristic: Heuristic = Heuristic.NONE,
+               restriction: Restriction = Restriction.NONE, skipped: Counter = None,
+               first: chess.Move = None, ordering=None, ply: int = 0) -> Iterator[chess.Move]:
+    """
+    Lazily generates the legal moves of a position of a mate search under a move restriction
+    :param board: The chess board, it must be the same position whenever the generator resumes
+    :param player: The player to solve the puzzle for, True for WHITE and False for BLACK
+    :param mate: There is a checkmate in n moves
+    :param heuristic: The move ordering heuristics to use
+    :param restriction: The mate move restriction to use
+    :param skipped: A counter of the moves the restriction skipped
+    :param first: A move to generate before every other move, if it is legal and allowed by the restriction
+    :param ordering: The MoveOrdering with the killer moves and history scores of the search
+    :param ply: The depth of the position
+    :return: An iterator of the legal moves
     """
-    NONE = 0
-    CHECK = 1
+    check = heuristic & Heuristic.CHECK
+    mvv_lva = bool(heuristic & Heuristic.MVV_LVA)
+    killers = ordering.killer_moves(ply) if ordering is not None and heuristic & Heuristic.KILLER else ()
+    history = ordering.history_key(ply) if ordering is not None and heuristic & Heuristic.HISTORY else None
+
+    if restriction == Restriction.NONE or board.turn != player:  # Only the moves of the player are restricted
+        return staged_moves(board, bool(check), first=first, mvv_lva=mvv_lva, killers=killers, history=history)
+    elif mate == 1:  # The final move of the player has to be a checkmate, so it has to be a check
+        return staged_moves(board, checks_only=True, skipped=skipped, first=first)
+    else:
+        checks_first = bool(check) or restriction == Restriction.CHECKS_FIRST
+        counter = skipped if restriction == Restriction.CHECKS_FIRST else None
+        return staged_moves(board, checks_first, skipped=counter, first=first, mvv_lva=mvv_lva, killers=killers,
+                            history=history)
 
 
 class State:
+    __slots__ = ('player', 'mate', 'key', '_board', '_parent', '_move', '_utility')
 
-    def __init__(self, player: bool, position: str, mate: int):
+    def __init__(self, player: bool, position: str, mate: int, key: int = None, parent: 'State' = None,
+                 move: chess.Move = None):
         """
-        Initializes the State
+        Initializes the State. A successor state only keeps its parent and the move from it, its board is created
+        when it is first needed and released once the state is searched.
         :param player: The current player, True for WHITE and False for BLACK
-        :param position: FEN of a chess position
+        :param position: FEN of a chess position, or None for a successor state
         :param mate: There is a checkmate in n moves
+        :param key: The Zobrist key of the position, calculated from the board if not given
+        :param parent: The state the move is played from, for a successor state
+        :param move: The move played from the parent, for a successor state
         """
-        self.position = position
         self.player = player
         self.mate = mate
-        self.board = chess.Board(position)  # Create a board from this position
+        self._parent = parent
+        self._move = move
+        self._board = chess.Board(position) if position is not None else None  # Create a board from this position
+        self.key = zobrist.hash_board(self._board) if key is None else key
+        self._utility = None
+
+    @property
+    def board(self) -> chess.Board:
+        """
+        The chess board of the position, created from the board of the parent if it was released
+        :return: The board
+        """
+        if self._board is None:
+            board = self._parent.board.copy(stack=False)
+            board.push(self._move)
+            self._board = board
+        return self._board
+
+    @property
+    def position(self) -> str:
+        """
+        FEN of the chess position, it is only formatted when it is needed
+        :return: The FEN of the position
+        """
+        return self.board.fen()
+
+    def release(self) -> None:
+        """
+        Releases the board of a searched successor state, the initial state keeps its board
+        """
+        if self._parent is not None:
+            self._board = None
 
     def terminal_test(self) -> bool:
         """
@@ -38,11 +203,9 @@ class State:
         Gets the utility value of a terminal state
         :return: +1 if player won the game, -1 if player lost the game or 0 if the game is draw or not over
         """
-        outcome = self.board.outcome()
-        if outcome and outcome.winner is not None:  # If white won
-            return 1 if outcome.winner == self.player else -1
-        else:
-            return 0
+        if self._utility is None:  # The searches ask a terminal state for its utility several times
+            self._utility = board_utility(self.board, self.player)
+        return self._utility
 
     def __str__(self) -> str:
         """
@@ -59,35 +222,36 @@ class State:
         """
         return self.position == __value.position
 
-    def find_successors(self, heuristic: Heuristic = Heuristic.NONE) -> queue.PriorityQueue:
+    def find_successors(self, heuristic: Heuristic = Heuristic.NONE, restriction: Restriction = Restriction.NONE,
+                        skipped: Counter = None, first: chess.Move = None, ordering=None,
+                        ply: int = 0) -> Iterator[tuple]:
         """
-        Finds all successor states of these states
-        :param heuristic: The move ordering heuristic to use, default is 0 to indicate no move ordering
-        :return: A PriorityQueue of the successor states
+        Lazily generates the successor states of this state, a successor is only created when it is asked for
+        :param heuristic: The move ordering heuristic to use, default is 0 to indicate no check stage
+        :param restriction: The mate move restriction to use, default is 0 to indicate every legal move
+        :param skipped: A counter of the moves the restriction skipped
+        :param first: A move to search before every other move, such as the best move of an earlier search
+        :param ordering: The MoveOrdering with the killer moves and history scores of the search
+        :param ply: The depth of this state
+        :return: An iterator of the moves and their successor states
         """
-        successors = queue.PriorityQueue()  # It is just a simple list if heuristic=0
-        for move in self.board.legal_moves:  # chess library helps with all legal moves
-            action = self.board.san(move)  # Get string representation of the move
-            self.board.push(move)  # Make a temporary move to get the new position
-            new_position = self.board.fen()  # Get the FEN of the new position
-            new_mate = self.mate if self.board.turn else self.mate - 1  # decrement mate only if Black moves
-            state = State(self.player, new_position, new_mate)  # Create the successor State
-            successors.put((self.h(heuristic), (action, state)))  # Add to the PriorityQueue
-            self.board.pop()  # Undo the temporary move
-
-        return successors
+        for move in mate_moves(self.board, self.player, self.mate, heuristic, restriction, skipped, first, ordering,
+                               ply):
+            successor = self.successor(move)
+            try:
+                yield move, successor
+            finally:
+                successor.release()  # The successor is searched once the next one is asked for
 
-    def h(self, heuristic: Heuristic) -> int:
+    def successor(self, move: chess.Move) -> 'State':
         """
-        Gets the heuristic value of this state
-        :param heuristic: The heuristic type to use, default is 0 to indicate no move ordering
-        :return: The heuristic value of this state
+        Creates the successor state reached by a move
+        :param move: A legal move of this state
+        :return: The successor State
         """
-
-        if heuristic == Heuristic.NONE:  # No Heuristic
-            return 0
-        elif heuristic == Heuristic.CHECK:  # Killer Move Heuristic: Check move first
-            if self.board.is_check():
-                return 0
-            else:
-                return 1
+        board = self.board.copy(stack=False)
+        new_key = zobrist.push(board, self.key, move)  # Make the move on a copy and update the key
+        new_mate = self.mate if board.turn else self.mate - 1  # decrement mate only if Black moves
+        successor = State(self.player, None, new_mate, new_key, self, move)
+        successor._board = board
+        return successor
@@ -0,0 +1,248 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import chess
+
+from state import State
+
+
+class SearchStats:
+    """
+    Statistics of a search run. Searches count the visited nodes by ply and the beta cutoffs, and call the registered
+    callbacks when they enter or exit a node and when they cut off.
+    """
+
+    def __init__(self):
+        """
+        Initialises empty statistics without callbacks
+        """
+        self.enter_callbacks = []
+        self.exit_callbacks = []
+        self.cutoff_callbacks = []
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Resets the statistics for a new search run, the callbacks are kept
+        """
+        self.nodes_by_ply = Counter()
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.skipped = Counter()  # Number of moves skipped by the mate move restriction, by restriction
+        self.table_probes = 0
+        self.table_hits = 0
+        self.table_stores = 0
+        self.times = Counter()  # Seconds spent by category, only while profiling
+        self.wall_time = 0.0
+        self.cached = False  # Whether the solution came from a solution cache instead of a search
+        self.aborted = None  # Why the search was aborted by its budget, None if it finished
+        self.proven_depth = 0  # The deepest checkmate depth proven to have no checkmate, by iterative deepening
+        self.proven = None  # The best checkmate found at the initial node so far, by searches that go on after one
+        self.expanded = 0  # Number of states expanded, the count of the searches that is left when they are aborted
+        self._table_counters = (0, 0, 0)
+        self._start = 0.0
+        self._profiled = 0  # Depth of the profiled calls, only the outermost call is timed
+
+    def on_enter(self, callback) -> None:
+        """
+        Registers a callback for every node the search enters
+        :param callback: A function of the ply, the move that leads to the node, alpha and beta
+        """
+        self.enter_callbacks.append(callback)
+
+    def on_exit(self, callback) -> None:
+        """
+        Registers a callback for every node the search exits
+        :param callback: A function of the ply, the move that leads to the node, alpha and beta the node was entered
+        with, the value of the node, whether the node was cut off and whether the value came from the transposition
+        table
+        """
+        self.exit_callbacks.append(callback)
+
+    def on_cutoff(self, callback) -> None:
+        """
+        Registers a callback for every beta cutoff
+        :param callback: A function of the ply, the move that caused the cutoff, its index among the searched moves and
+        the board of the node that is cut off
+        """
+        self.cutoff_callbacks.append(callback)
+
+    def enter(self, ply: int, move: chess.Move, alpha, beta) -> None:
+        """
+        Called by the searches when they enter a node
+        :param ply: The depth of the node
+        :param move: The move that leads to the node
+        :param alpha: The alpha value of the pruning
+        :param beta: The beta value of the pruning
+        """
+        self.nodes_by_ply[ply] += 1
+        for callback in self.enter_callbacks:
+            callback(ply, move, alpha, beta)
+
+    def exit(self, ply: int, move: chess.Move, alpha, beta, value, cutoff: bool = False,
+             table_hit: bool = False) -> None:
+        """
+        Called by the searches when they exit a node
+        :param ply: The depth of the node
+        :param move: The move that leads to the node
+        :param alpha: The alpha value the node was entered with
+        :param beta: The beta value the node was entered with
+        :param value: The value of the node
+        :param cutoff: Whether the search of the node was cut off
+        :param table_hit: Whether the value came from the transposition table
+        """
+        for callback in self.exit_callbacks:
+            callback(ply, move, alpha, beta, value, cutoff, table_hit)
+
+    def cutoff(self, ply: int, move: chess.Move, index: int, board: chess.Board) -> None:
+        """
+        Called by the searches when a move causes a beta cutoff
+        :param ply: The depth of the node that is cut off
+        :param move: The move that caused the cutoff
+        :param index: The index of the move among the searched moves, 0 for the first one
+        :param board: The board of the node that is cut off, the move is not made on it
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        for callback in self.cutoff_callbacks:
+            callback(ply, move, index, board)
+
+    def start(self, table) -> None:
+        """
+        Starts the statistics of a search run
+        :param table: The transposition table, its counters are taken as the starting point
+        """
+        self.reset()
+        self._table_counters = (table.probes, table.hits, table.stores)
+        self._start = time.perf_counter()
+
+    def finish(self, table) -> None:
+        """
+        Finishes the statistics of a search run
+        :param table: The transposition table the search used
+        """
+        self.wall_time = time.perf_counter() - self._start
+        probes, hits, stores = self._table_counters
+        self.table_probes = table.probes - probes
+        self.table_hits = table.hits - hits
+        self.table_stores = table.stores - stores
+
+    def nodes(self) -> int:
+        """
+        Gets the number of visited nodes
+        :return: The number of nodes over every ply
+        """
+        return sum(self.nodes_by_ply.values())
+
+    def first_move_cutoff_rate(self) -> float:
+        """
+        Gets the fraction of the cutoffs that were caused by the first searched move
+        :return: The first move cutoff rate
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def effective_branching_factor(self) -> float:
+        """
+        Gets the effective branching factor, the geometric mean of the growth of the number of nodes from ply to ply
+        :return: The effective branching factor
+        """
+        if not self.nodes_by_ply:
+            return 0.0
+        first, last = min(self.nodes_by_ply), max(self.nodes_by_ply)
+        if first == last:
+            return 0.0
+        return (self.nodes_by_ply[last] / self.nodes_by_ply[first]) ** (1 / (last - first))
+
+    def summary(self) -> dict:
+        """
+        Gets the statistics as a dictionary
+        :return: A dictionary of the statistics
+        """
+        return {
+            'nodes': self.nodes(),
+            'nodes_by_ply': [self.nodes_by_ply[ply] for ply in range(max(self.nodes_by_ply, default=-1) + 1)],
+            'cutoffs': self.cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate(),
+            'effective_branching_factor': self.effective_branching_factor(),
+            'skipped': sum(self.skipped.values()),
+            'table_probes': self.table_probes,
+            'table_hits': self.table_hits,
+            'table_stores': self.table_stores,
+            'times': dict(self.times),
+            'wall_time': self.wall_time,
+            'cached': self.cached,
+            'aborted': self.aborted,
+            'proven_depth': self.proven_depth,
+        }
+
+    def timed(self, function, category: str):
+        """
+        Wraps a function so the time spent in it is added to a category, calls made from inside another timed call
+        are left to the outer one
+        :param function: The function to wrap
+        :param category: The category of the time
+        :return: The wrapped function
+        """
+        def wrapper(*args, **kwargs):
+            if self._profiled:
+                return function(*args, **kwargs)
+            self._profiled += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.times[category] += time.perf_counter() - start
+                self._profiled -= 1
+        return wrapper
+
+    def timed_generator(self, function, category: str):
+        """
+        Wraps a generator function so the time spent producing every item is added to a category
+        :param function: The generator function to wrap
+        :param category: The category of the time
+        :return: The wrapped generator function
+        """
+        def wrapper(*args, **kwargs):
+            iterator = function(*args, **kwargs)
+            while True:
+                if self._profiled:
+                    item = next(iterator, StopIteration)
+                else:
+                    self._profiled += 1
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator, StopIteration)
+                    finally:
+                        self.times[category] += time.perf_counter() - start
+                        self._profiled -= 1
+                if item is StopIteration:
+                    return
+                yield item
+        return wrapper
+
+    @contextmanager
+    def profiling(self):
+        """
+        Times the move generation, successor creation, SAN formatting, terminal tests and utilities while the context
+        is open, by wrapping the methods of chess.Board and State that do the work
+        """
+        patches = [
+            (chess.Board, 'generate_legal_moves', self.timed_generator(chess.Board.generate_legal_moves,
+                                                                       'move_generation')),
+            (chess.Board, 'gives_check', self.timed(chess.Board.gives_check, 'move_generation')),
+            (chess.Board, 'is_capture', self.timed(chess.Board.is_capture, 'move_generation')),
+            (chess.Board, 'san', self.timed(chess.Board.san, 'san')),
+            (chess.Board, 'is_game_over', self.timed(chess.Board.is_game_over, 'terminal_test')),
+            (chess.Board, 'outcome', self.timed(chess.Board.outcome, 'utility')),
+            (State, 'successor', self.timed(State.successor, 'successor')),
+        ]
+        originals = [(owner, name, owner.__dict__[name]) for owner, name, wrapper in patches]
+        for owner, name, wrapper in patches:
+            setattr(owner, name, wrapper)
+        try:
+            yield self
+        finally:
+            for owner, name, original in originals:
+                setattr(owner, name, original)
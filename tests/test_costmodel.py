@@ -0,0 +1,22 @@
+import json
+
+import chess
+
+from costmodel import estimate_cost, load_timings, order_by_cost
+
+
+def test_cached_results_are_not_timings(tmp_path):
+    history = tmp_path / 'run.jsonl'
+    results = [
+        {'position': chess.STARTING_FEN, 'mate': 2, 'time': 1.5, 'stats': {'cached': False}},
+        {'position': '8/8/8/8/8/5k2/8/4K2R w K - 0 1', 'mate': 3, 'time': 0.001, 'stats': {'cached': True}},
+    ]
+    history.write_text('\n'.join(json.dumps(result) for result in results) + '\n')
+    assert load_timings([str(history)]) == {(chess.STARTING_FEN, 2): 1.5}
+
+
+def test_deeper_puzzles_come_first():
+    puzzles = [{'position': chess.STARTING_FEN, 'mate': mate} for mate in (2, 4, 3)]
+    tasks = [('file', index, puzzle) for index, puzzle in enumerate(puzzles)]
+    assert [task[1] for task in order_by_cost(tasks)] == [1, 2, 0]
+    assert estimate_cost(puzzles[1]) > estimate_cost(puzzles[2]) > estimate_cost(puzzles[0])
@@ -0,0 +1,32 @@
+import chess
+
+from ordering import MoveOrdering
+
+# White can capture on d5, give check with Bb5+ and play the quiet move Nf3
+BOARD = chess.Board('rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2')
+
+
+def test_quiet_cutoffs_are_learned():
+    ordering = MoveOrdering()
+    move = chess.Move.from_uci('g1f3')
+    ordering(2, move, 3, BOARD)
+    assert ordering.killer_moves(2) == (move,)
+    assert ordering.history_key(2)(move) > 0
+    assert ordering.history_key(3)(move) == 0
+
+
+def test_captures_and_checks_are_not_learned():
+    ordering = MoveOrdering()
+    for uci in ('e4d5', 'f1b5'):
+        move = chess.Move.from_uci(uci)
+        ordering(2, move, 0, BOARD)
+        assert ordering.history_key(2)(move) == 0
+    assert ordering.killer_moves(2) == ()
+
+
+def test_killer_slots_keep_the_newest_moves():
+    ordering = MoveOrdering()
+    moves = [chess.Move.from_uci(uci) for uci in ('g1f3', 'b1c3', 'd2d3')]
+    for move in moves:
+        ordering(4, move, 1, BOARD)
+    assert ordering.killer_moves(4) == (moves[2], moves[1])
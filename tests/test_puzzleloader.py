@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+import puzzleloader
+from puzzleloader import PuzzleFormat
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'puzzles')
+
+# Henry Buckle vs NN, London, 1840: 1. Nf6+ gxf6 2. Bxf7#
+EPD = 'r2qkb1r/pp2nppp/3p4/2pNN1B1/2BnP3/3P4/PPP2PPP/R2bK2R w KQkq -'
+SOLUTION = [{'w': 'Nf6+', 'b': 'gxf6'}, {'w': 'Bxf7#'}]
+
+
+def write(tmp_path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_format_is_guessed_from_the_extension():
+    assert puzzleloader.puzzle_format('puzzles.EPD') == PuzzleFormat.EPD
+    assert puzzleloader.puzzle_format('lichess_db_puzzle.csv') == PuzzleFormat.CSV
+    assert puzzleloader.puzzle_format('puzzles/mate2.txt') == PuzzleFormat.WTHARVEY
+
+
+def test_epd_with_dm_and_bm(tmp_path):
+    path = write(tmp_path, 'puzzles.epd', '# A comment line\n' + EPD + ' dm 2; bm Nf6+; id "buckle";\n')
+    [puzzle] = puzzleloader.load_puzzle_file(path)
+    assert puzzle['meta'] == {'id': 'buckle'}
+    assert puzzle['player'] is True
+    assert puzzle['position'].startswith(EPD)
+    assert puzzle['mate'] == 2
+    assert puzzle['solution'] == [{'w': 'Nf6+'}]
+
+
+def test_epd_without_dm_takes_the_depth_of_the_pv(tmp_path):
+    path = write(tmp_path, 'puzzles.epd', EPD + ' pv Nf6+ gxf6 Bxf7#;\n')
+    [puzzle] = puzzleloader.load_puzzle_file(path)
+    assert puzzle['mate'] == 2
+    assert puzzle['solution'] == SOLUTION
+    assert puzzleloader.solution_moves(puzzle) == ['Nf6+', 'gxf6', 'Bxf7#']
+
+
+def test_lichess_csv_plays_the_setup_move(tmp_path):
+    # The opponent captures the queen with Bxd1, then the puzzle starts
+    path = write(tmp_path, 'puzzles.csv', 'PuzzleId,FEN,Moves,Rating\n'
+                 'buckle,r2qkb1r/pp2nppp/3p4/2pNN1B1/2BnP1b1/3P4/PPP2PPP/R2QK2R b KQkq - 0 1,'
+                 'g4d1 d5f6 g7f6 c4f7,1500\n')
+    [puzzle] = puzzleloader.load_puzzle_file(path)
+    assert puzzle['meta'] == {'id': 'buckle'}
+    assert puzzle['player'] is True
+    assert puzzle['position'].startswith(EPD)
+    assert puzzle['mate'] == 2
+    assert puzzle['solution'] == SOLUTION
+
+
+def test_csv_with_san_moves_and_black_to_move(tmp_path):
+    path = write(tmp_path, 'puzzles.csv', 'id,fen,moves\n'
+                 'fool,rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq - 0 2,Qh4#\n')
+    [puzzle] = puzzleloader.load_puzzle_file(path)
+    assert puzzle['meta'] == {'id': 'fool'}
+    assert puzzle['player'] is False
+    assert puzzle['mate'] == 1
+    assert puzzle['solution'] == [{'b': 'Qh4#'}]
+
+
+def test_start_stop_and_shard_select_records():
+    filename = os.path.join(PUZZLES, 'mate2.txt')
+    puzzles = puzzleloader.load_puzzle_file(filename)
+    selected = list(puzzleloader.iter_puzzles(filename, start=2, stop=8, shard=1, shards=3))
+    assert [index for index, puzzle in selected] == [4, 7]
+    assert [puzzle for index, puzzle in selected] == [puzzles[4], puzzles[7]]
+
+
+@pytest.mark.parametrize('shards', [1, 2, 3])
+def test_shards_cover_every_record_once(tmp_path, shards):
+    path = write(tmp_path, 'puzzles.epd', ''.join(EPD + ' dm 2; id "%d";\n' % index for index in range(7)))
+    indexes = sorted(index for shard in range(shards)
+                     for index, puzzle in puzzleloader.iter_puzzles(path, shard=shard, shards=shards))
+    assert indexes == list(range(7))
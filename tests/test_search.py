@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+import puzzleloader
+import search
+from budget import Budget
+from cache import SolutionCache
+from main import SearchAlgorithm, run_search
+from state import Restriction, State
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'puzzles')
+
+
+def load(filename: str) -> list:
+    return [puzzle for index, puzzle in puzzleloader.iter_puzzles(os.path.join(PUZZLES, filename))]
+
+
+@pytest.mark.parametrize('puzzle', load('mate3.txt'))
+def test_proof_number_with_final_checks(puzzle):
+    # Positions where the restriction leaves no move to search used to crash the update of their proof numbers
+    initial_state = State(puzzle['player'], puzzle['position'], puzzle['mate'])
+    terminal, expanded = run_search(initial_state, SearchAlgorithm.PROOF_NUMBER, Restriction.FINAL_CHECKS)
+    assert terminal.state.utility() == 1
+    assert (terminal.depth + 1) // 2 <= puzzle['mate']
+
+
+@pytest.mark.parametrize('puzzle', load('mate3.txt')[:4])
+def test_proof_number_without_mate_does_not_lose(puzzle):
+    # Without a checkmate in fewer moves, the line followed has to avoid the moves the opponent wins after
+    initial_state = State(puzzle['player'], puzzle['position'], puzzle['mate'] - 1)
+    terminal, expanded = run_search(initial_state, SearchAlgorithm.PROOF_NUMBER)
+    assert terminal.state.utility() == 0
+
+
+def test_cache_hit_leaves_the_table(tmp_path):
+    puzzle = load('mate2.txt')[0]
+    initial_state = State(puzzle['player'], puzzle['position'], puzzle['mate'])
+    cache = SolutionCache(str(tmp_path / 'cache.sqlite'))
+    terminal, expanded = run_search(initial_state, SearchAlgorithm.KILLER_MOVE_HEURISTIC, cache=cache)
+    entries = len(search.transposition_table)
+    assert entries and not search.stats.cached
+
+    cached, cached_expanded = run_search(initial_state, SearchAlgorithm.KILLER_MOVE_HEURISTIC, cache=cache)
+    assert search.stats.cached
+    assert (cached.line(), cached_expanded) == (terminal.line(), expanded)
+    assert len(search.transposition_table) == entries
+    cache.close()
+
+
+@pytest.mark.parametrize('search_type', list(SearchAlgorithm))
+def test_expanded_states_are_counted_in_the_statistics(search_type):
+    # An aborted search reports the count of the statistics, so it has to be the count the searches return
+    puzzle = load('mate2.txt')[1]
+    terminal, expanded = run_search(State(puzzle['player'], puzzle['position'], puzzle['mate']), search_type)
+    assert terminal.state.utility() == 1
+    assert search.stats.expanded == expanded
+
+
+def test_aborted_minimax_returns_the_checkmate_found():
+    puzzle = load('mate2.txt')[0]
+    initial_state = State(puzzle['player'], puzzle['position'], puzzle['mate'])
+    terminal, expanded = run_search(initial_state, SearchAlgorithm.MINIMAX, budget=Budget(node_limit=30000))
+    assert search.stats.aborted == 'nodes'
+    assert terminal.state.utility() == 1
+    assert search.stats.expanded == expanded < 1640
+
+
+def test_aborted_principal_variation_returns_the_checkmate_found():
+    puzzle = load('mate3.txt')[1]
+    initial_state = State(puzzle['player'], puzzle['position'], puzzle['mate'])
+    terminal, expanded = run_search(initial_state, SearchAlgorithm.PRINCIPAL_VARIATION, budget=Budget(node_limit=100))
+    assert search.stats.aborted == 'nodes'
+    assert terminal.state.board.is_checkmate() and terminal.state.utility() == 1
+    assert len(terminal.line()) <= 2 * puzzle['mate'] - 1
+
+
+def test_cutoff_callbacks_get_the_board_before_the_move():
+    puzzle = load('mate2.txt')[0]
+    cutoffs = []
+    search.stats.on_cutoff(lambda ply, move, index, board: cutoffs.append(board.is_legal(move)))
+    try:
+        run_search(State(puzzle['player'], puzzle['position'], puzzle['mate']), SearchAlgorithm.ALPHA_BETA_PRUNING)
+    finally:
+        search.stats.cutoff_callbacks.pop()
+    assert cutoffs and all(cutoffs)
+
+
+@pytest.mark.parametrize('search_type', list(SearchAlgorithm))
+def test_no_move_left_by_the_restriction_is_expanded_once(search_type):
+    # White has no check, so FINAL_CHECKS leaves the initial node no move to search for a mate in 1
+    initial_state = State(True, '4k3/8/8/8/8/8/4P3/4K2N w - - 0 1', 1)
+    terminal, expanded = run_search(initial_state, search_type, Restriction.FINAL_CHECKS)
+    assert terminal.state.utility() == 0
+    assert expanded == 1
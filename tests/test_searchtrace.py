@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+import puzzleloader
+import search
+from main import SearchAlgorithm, run_search
+from searchtrace import read_trace, summarize_trace
+from state import State
+from ttable import unpack_move
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'puzzles')
+
+
+@pytest.mark.parametrize('search_type', [SearchAlgorithm.ALPHA_BETA_PRUNING, SearchAlgorithm.KILLER_MOVE_HEURISTIC])
+def test_trace_summary_matches_the_statistics(tmp_path, search_type):
+    puzzle = puzzleloader.load_puzzle_file(os.path.join(PUZZLES, 'mate3.txt'))[0]
+    path = str(tmp_path / 'search.trace')
+    terminal, expanded = run_search(State(puzzle['player'], puzzle['position'], puzzle['mate']), search_type,
+                                    trace=path)
+    summary = summarize_trace(path, top=3, plies=2)
+
+    nodes_by_ply = search.stats.nodes_by_ply
+    assert summary['nodes'] == search.stats.nodes() == sum(1 for record in read_trace(path))
+    assert summary['nodes_by_ply'] == [nodes_by_ply[ply] for ply in range(max(nodes_by_ply) + 1)]
+    assert summary['cutoffs'] == search.stats.cutoffs
+
+    hottest = summary['hottest'][1][0]  # The largest subtree below the initial node
+    assert len(hottest['line']) == 1 and 1 <= hottest['nodes'] < summary['nodes']
+    assert sum(subtree['nodes'] for subtree in summary['hottest'][1]) < summary['nodes']
+
+
+def test_last_record_is_the_initial_node(tmp_path):
+    puzzle = puzzleloader.load_puzzle_file(os.path.join(PUZZLES, 'mate2.txt'))[0]
+    path = str(tmp_path / 'search.trace')
+    terminal, expanded = run_search(State(puzzle['player'], puzzle['position'], puzzle['mate']),
+                                    SearchAlgorithm.ALPHA_BETA_PRUNING, trace=path)
+    records = list(read_trace(path))
+    move, ply, flags, alpha, beta, value = records[-1]
+    assert unpack_move(move) is None and ply == 0
+    assert value == terminal.state.utility() == 1
+    assert all(unpack_move(record[0]) is not None for record in records[:-1])
+
+
+def test_other_files_are_not_traces(tmp_path):
+    path = tmp_path / 'not.trace'
+    path.write_bytes(b'JUNK\x01')
+    with pytest.raises(ValueError):
+        list(read_trace(str(path)))
@@ -0,0 +1,57 @@
+import chess
+import pytest
+
+from ttable import Bound, TranspositionTable, pack_move, unpack_move
+
+
+@pytest.fixture(scope='module')
+def table():
+    return TranspositionTable(1)
+
+
+@pytest.mark.parametrize('move', [
+    None,
+    chess.Move.from_uci('a1a2'),
+    chess.Move.from_uci('h8a1'),
+    chess.Move.from_uci('e7e8q'),
+    chess.Move.from_uci('b2a1n'),
+])
+def test_pack_move_round_trip(move):
+    assert unpack_move(pack_move(move)) == move
+
+
+def test_pack_move_is_never_zero():
+    assert all(pack_move(chess.Move(square, square ^ 1)) for square in chess.SQUARES)
+
+
+@pytest.mark.parametrize('bound', list(Bound))
+@pytest.mark.parametrize('value', [-1000, -1, 0, 1, 999])
+def test_store_probe_round_trip(table, bound, value):
+    table.clear()
+    key = 0x9d39247e33776d41
+    move = chess.Move.from_uci('g7g8r')
+    table.store(key, 3, bound, value, 5, move)
+    assert table.probe(key, 3) == (bound, value, 5, move)
+    assert table.best_move(key) == move
+
+
+def test_probe_misses_other_depths_and_keys(table):
+    table.clear()
+    key = 0x2af7398005aaa5c7
+    table.store(key, 2, Bound.EXACT, 1, 3, None)
+    assert table.probe(key, 1) is None
+    assert table.probe(key ^ 1 << 40, 2) is None
+    assert table.probe(key, 2) == (Bound.EXACT, 1, 3, None)
+
+
+def test_new_search_replaces_older_entries_first(table):
+    table.clear()
+    key = 0x44db015024623547
+    other = key + (table.mask + 1)  # The same slot
+    table.store(key, 4, Bound.EXACT, 1, 1, None)
+    table.store(other, 2, Bound.EXACT, -1, 1, None)
+    assert table.probe(other, 2) is None  # The deeper entry is kept
+    table.new_search()
+    table.store(other, 2, Bound.EXACT, -1, 1, None)
+    assert table.probe(other, 2) == (Bound.EXACT, -1, 1, None)
+    assert table.probe(key, 4) is None
@@ -0,0 +1,53 @@
+import os
+
+import puzzleloader
+from state import State
+from verify import find_cooks, verify_solution
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'puzzles')
+
+# Henry Buckle vs NN, London, 1840: 1. Nf6+ gxf6 2. Bxf7#
+BUCKLE = puzzleloader.load_puzzle_file(os.path.join(PUZZLES, 'mate2.txt'))[0]
+BUCKLE_STATE = State(BUCKLE['player'], BUCKLE['position'], BUCKLE['mate'])
+
+# Both rooks give a back rank checkmate
+TWO_ROOKS = State(True, '7k/6pp/8/8/8/8/8/RR4K1 w - - 0 1', 1)
+
+
+def test_correct_solution_is_verified():
+    result = verify_solution(BUCKLE_STATE, puzzleloader.solution_moves(BUCKLE))
+    assert result['status'] == 'verified'
+    assert result['reason'] is None and result['refutation'] == []
+
+
+def test_wrong_key_move_is_refuted_by_a_defence():
+    result = verify_solution(BUCKLE_STATE, ['Nxf7', 'Rg8', 'Nd6#'])
+    assert result['status'] == 'refuted'
+    assert result['reason'] == "the defence escapes the checkmate"
+    assert result['refutation'] == ['Nxf7', 'Kxf7']
+
+
+def test_solution_that_does_not_end_in_checkmate_is_refuted():
+    result = verify_solution(BUCKLE_STATE, ['Nf6+', 'gxf6', 'Bb5+'])
+    assert result['status'] == 'refuted'
+    assert result['reason'] == "the solution does not end in checkmate"
+    assert result['refutation'] == ['Nf6+', 'gxf6', 'Bb5+']
+
+
+def test_illegal_move_is_refuted():
+    result = verify_solution(BUCKLE_STATE, ['Nf6+', 'Kf8', 'Bxf7#'])
+    assert result['status'] == 'refuted'
+    assert result['reason'] == "illegal move Kf8"
+    assert result['refutation'] == ['Nf6+']
+
+
+def test_cook_is_reported():
+    result = find_cooks(TWO_ROOKS)
+    assert not result['unique']
+    assert sorted(result['winning_moves']) == ['Ra8#', 'Rb8#']
+
+
+def test_unique_checkmate_has_no_cook():
+    result = find_cooks(BUCKLE_STATE)
+    assert result['unique']
+    assert result['winning_moves'] == ['Nf6+']
@@ -0,0 +1,31 @@
+import chess
+import chess.polyglot
+import pytest
+
+import zobrist
+
+POSITIONS = [
+    chess.STARTING_FEN,
+    'r3k2r/pppq1ppp/2npbn2/4p3/2B1P3/2NP1N2/PPPQ1PPP/R3K2R w KQkq - 0 8',  # Castling both ways
+    'rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3',  # En passant
+    '8/1P4k1/8/8/8/8/6Kp/8 w - - 0 1',  # Promotions of both players
+]
+
+
+@pytest.mark.parametrize('fen', POSITIONS)
+def test_hash_board_matches_polyglot(fen):
+    board = chess.Board(fen)
+    assert zobrist.hash_board(board) == chess.polyglot.zobrist_hash(board)
+
+
+@pytest.mark.parametrize('fen', POSITIONS)
+def test_push_matches_polyglot(fen):
+    board = chess.Board(fen)
+    key = zobrist.hash_board(board)
+    for move in list(board.legal_moves):
+        new_key = zobrist.push(board, key, move)
+        assert new_key == chess.polyglot.zobrist_hash(board), board.fen()
+        for reply in list(board.legal_moves):  # The replies undo castling rights and en passant squares again
+            assert zobrist.push(board, new_key, reply) == chess.polyglot.zobrist_hash(board), board.fen()
+            board.pop()
+        board.pop()
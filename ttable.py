@@ -0,0 +1,201 @@
+from array import array
+from enum import IntEnum
+from multiprocessing import shared_memory
+
+import chess
+
+
+class Bound(IntEnum):
+    """
+    Enumeration of the kinds of value stored in the transposition table
+    """
+    EXACT = 0  # The value is exact, the search was not cut off
+    LOWER = 1  # The search failed high, the real value is at least the value
+    UPPER = 2  # The search failed low, the real value is at most the value
+
+
+def pack_move(move: chess.Move) -> int:
+    """
+    Packs a move into 16 bits
+    :param move: The move, or None
+    :return: The packed move, 0 for None
+    """
+    if move is None:
+        return 0
+    return 0x8000 | move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def unpack_move(code: int) -> chess.Move:
+    """
+    Unpacks a move packed by pack_move
+    :param code: The packed move
+    :return: The move, or None
+    """
+    if not code:
+        return None
+    return chess.Move(code & 0x3f, code >> 6 & 0x3f, (code >> 12 & 0x7) or None)
+
+
+class TranspositionTable:
+    """
+    A transposition table with a fixed number of slots. Each slot holds the Zobrist key and one 64-bit word of data:
+    the packed best move (bits 0-15), the distance in moves to the terminal position (16-23), the remaining depth
+    (24-31), the bound (32-33), the search generation (34-41) and the value offset by 0x8000 (42-57). The key is
+    stored XORed with the data, so a slot torn by two processes writing it at once no longer matches its key.
+    """
+    ENTRY_SIZE = 16  # Number of bytes used by one slot
+
+    def __init__(self, megabytes: int = 32):
+        """
+        Initialises a transposition table with a fixed memory budget
+        :param megabytes: The memory budget of the table
+        """
+        size = self.slots(megabytes)
+        self.mask = size - 1
+        self.keys = array('Q', bytes(8 * size))
+        self.data = array('Q', bytes(8 * size))
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    @classmethod
+    def slots(cls, megabytes: int) -> int:
+        """
+        Gets the number of slots of a table
+        :param megabytes: The memory budget of the table
+        :return: The largest power of two of slots that fits the budget
+        """
+        size = 1
+        while size * 2 * cls.ENTRY_SIZE <= megabytes * 2 ** 20:
+            size *= 2
+        return size
+
+    def clear(self) -> None:
+        """
+        Removes all entries and resets the counters, the slots are zeroed in place
+        """
+        zeros = bytes(8 * len(self.keys))
+        memoryview(self.keys).cast('B')[:] = zeros
+        memoryview(self.data).cast('B')[:] = zeros
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self) -> None:
+        """
+        Starts a new search generation, entries of older generations are replaced first
+        """
+        self.age = (self.age + 1) & 0xff
+
+    def probe(self, key: int, depth: int) -> tuple:
+        """
+        Looks up a position
+        :param key: The Zobrist key of the position
+        :param depth: The remaining depth of the search from the position
+        :return: A tuple of the bound, value, distance and best move of the position, or None if it is not in the table
+        """
+        self.probes += 1
+        index = key & self.mask
+        data = self.data[index]
+        if data and self.keys[index] ^ data == key and data >> 24 & 0xff == depth:
+            self.hits += 1
+            return data >> 32 & 0x3, (data >> 42 & 0xffff) - 0x8000, data >> 16 & 0xff, unpack_move(data & 0xffff)
+        return None
+
+    def best_move(self, key: int) -> chess.Move:
+        """
+        Looks up the best move of a position stored at any depth, to search it first
+        :param key: The Zobrist key of the position
+        :return: The best move of the position, or None if it is not in the table
+        """
+        index = key & self.mask
+        data = self.data[index]
+        if data and self.keys[index] ^ data == key:
+            return unpack_move(data & 0xffff)
+        return None
+
+    def store(self, key: int, depth: int, bound: Bound, value: int, distance: int, move: chess.Move) -> None:
+        """
+        Stores a position, keeping the deeper entry when two positions share a slot
+        :param key: The Zobrist key of the position
+        :param depth: The remaining depth of the search from the position
+        :param bound: Whether the value is exact, a lower bound or an upper bound
+        :param value: The value of the position
+        :param distance: The number of moves from the position to the terminal position of the value
+        :param move: The best move of the position
+        """
+        index = key & self.mask
+        data = self.data[index]
+        if (not data or self.keys[index] ^ data == key or data >> 34 & 0xff != self.age or
+                depth >= data >> 24 & 0xff):
+            data = (pack_move(move) | min(distance, 0xff) << 16 | depth << 24 | bound << 32 | self.age << 34 |
+                    (value + 0x8000) << 42)
+            self.keys[index] = key ^ data
+            self.data[index] = data
+            self.stores += 1
+
+    def hit_rate(self) -> float:
+        """
+        Gets the fraction of the probes that found their position
+        :return: The hit rate of the table
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __len__(self) -> int:
+        """
+        Gets the number of filled slots
+        :return: The number of entries in the table
+        """
+        return sum(1 for data in self.data if data)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    A transposition table in shared memory, every process attached to it reads and writes the same slots without
+    locks. The counters and the search generation belong to each process.
+    """
+
+    def __init__(self, megabytes: int = 32, name: str = None):
+        """
+        Creates a shared transposition table, or attaches to an existing one
+        :param megabytes: The memory budget of the table, it has to be the same for every process
+        :param name: The name of the shared memory of an existing table, default is to create a new one
+        """
+        size = self.slots(megabytes)
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size * self.ENTRY_SIZE)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        self._words = self.memory.buf.cast('Q')
+        self.mask = size - 1
+        self.keys = self._words[:size]
+        self.data = self._words[size:2 * size]
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def clear(self) -> None:
+        """
+        Removes all entries for every attached process and resets the counters of this process
+        """
+        self.memory.buf[:len(self.keys) * self.ENTRY_SIZE] = bytes(len(self.keys) * self.ENTRY_SIZE)
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def close(self, unlink: bool = False) -> None:
+        """
+        Detaches this process from the table
+        :param unlink: Whether to also free the shared memory, only the process that created the table should do it
+        """
+        self.keys.release()
+        self.data.release()
+        self._words.release()
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
@@ -0,0 +1,214 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import chess
+
+import puzzleloader
+import search
+from node import Node
+from state import Heuristic, Restriction, State
+
+
+@contextmanager
+def search_run():
+    """
+    Brackets the searches of one puzzle, they start with an empty transposition table and their statistics are left
+    in search.stats
+    """
+    search.transposition_table.clear()
+    search.transposition_table.new_search()
+    search.stats.start(search.transposition_table)
+    search.move_ordering.clear()
+    search.stats.on_cutoff(search.move_ordering)
+    try:
+        yield
+    finally:
+        search.stats.cutoff_callbacks.remove(search.move_ordering)
+        search.stats.finish(search.transposition_table)
+
+
+def defended(state: State, ply: int, move: chess.Move) -> (bool, int):
+    """
+    Checks if a defence of the opponent escapes the checkmate, the player has to give a checkmate within the
+    checkmate depth that is left. Only a null window search for any checkmate is needed, the checkmates of the
+    player are always checks so only checks are searched at the final move.
+    :param state: The state after the defence, the player is to move
+    :param ply: The depth of the state
+    :param move: The move of the defence
+    :return: Whether the defence escapes the checkmate and the number of states expanded to find out
+    """
+    if state.terminal_test():
+        return state.utility() != 1, 0
+    value, distance, expanded = search.table_search(state, True, 0, 1, Heuristic.ALL, Restriction.FINAL_CHECKS, ply,
+                                                    move)
+    return value < 1, expanded
+
+
+def verify_solution(initial_state: State, moves: list) -> dict:
+    """
+    Verifies that the solution of a puzzle is a forced checkmate without searching for it. The moves of the player
+    are played as given, every other defence of the opponent is searched for a checkmate within the depth that is
+    left, and the final move has to be a checkmate.
+    :param initial_state: The initial state of the puzzle
+    :param moves: The moves of the solution in Standard Algebraic Notation, as given by puzzleloader.solution_moves
+    :return: A dictionary of the result, its 'status' is 'verified' or 'refuted', and a refuted solution has the
+    'reason' and the 'refutation' line that leads to the mistake
+    """
+    with search_run():
+        state = initial_state
+        line = []
+        total_expanded = 0
+
+        for ply, san in enumerate(moves):
+            board = state.board
+            if state.terminal_test():
+                return refuted("the solution goes on after the game is over", line, total_expanded)
+            try:
+                move = board.parse_san(san)
+            except ValueError:  # After a wrong move of the player, a defence may still refute it
+                move = None
+
+            if board.turn != state.player:  # Every other defence has to lose as well
+                for defence in board.legal_moves:
+                    if defence == move:
+                        continue
+                    escaped, expanded = defended(state.successor(defence), ply + 1, defence)
+                    total_expanded += expanded
+                    if escaped:
+                        return refuted("the defence escapes the checkmate", line + [board.san(defence)],
+                                       total_expanded)
+
+            if move is None:
+                return refuted("illegal move " + san, line, total_expanded)
+            line.append(board.san(move))
+            state = state.successor(move)
+            total_expanded += 1
+
+        if not state.board.is_checkmate() or state.utility() != 1:
+            return refuted("the solution does not end in checkmate", line, total_expanded)
+        return {'status': 'verified', 'reason': None, 'refutation': [], 'expanded': total_expanded}
+
+
+def find_cooks(initial_state: State, restriction: Restriction = Restriction.FINAL_CHECKS,
+               find_all: bool = True) -> dict:
+    """
+    Finds every first move of the player that gives a checkmate within the checkmate depth, a puzzle with more than
+    one has cooks
+    :param initial_state: The initial state of the puzzle
+    :param restriction: The mate move restriction to use, only checks are searched at the final move by default as
+    every checkmate is a check
+    :param find_all: Whether to find every winning first move, otherwise the search stops at the second one
+    :return: A dictionary of the result, whether the checkmate is 'unique' and the 'winning_moves' in Standard
+    Algebraic Notation
+    """
+    with search_run():
+        moves, expanded = search.winning_moves(Node(True, initial_state, 0), Heuristic.ALL, restriction, find_all)
+    board = initial_state.board
+    return {'unique': len(moves) == 1, 'winning_moves': [board.san(move) for move in moves], 'expanded': expanded}
+
+
+def refuted(reason: str, line: list, expanded: int) -> dict:
+    """
+    Formats the result of a refuted solution
+    :param reason: Why the solution is not a forced checkmate
+    :param line: The moves from the initial position to the mistake
+    :param expanded: The number of states expanded
+    :return: A dictionary of the result
+    """
+    return {'status': 'refuted', 'reason': reason, 'refutation': line, 'expanded': expanded}
+
+
+def verify_puzzle(task: tuple) -> dict:
+    """
+    Verifies a single puzzle, this runs inside a worker process
+    :param task: A tuple of the puzzle filename, the puzzle index, the puzzle and whether to find its cooks
+    :return: A dictionary of the result
+    """
+    filename, index, puzzle, cooks = task
+    initial_state = State(puzzle['player'], puzzle['position'], puzzle['mate'])
+
+    start = time.perf_counter()
+    result = verify_solution(initial_state, puzzleloader.solution_moves(puzzle))
+    if cooks:
+        cooked = find_cooks(initial_state)
+        result.update(unique=cooked['unique'], winning_moves=cooked['winning_moves'],
+                      expanded=result['expanded'] + cooked['expanded'])
+    elapsed = time.perf_counter() - start
+
+    return {
+        'file': filename,
+        'index': index,
+        'position': puzzle['position'],
+        'mate': puzzle['mate'],
+        **result,
+        'time': elapsed,
+        'solution': puzzle['solution'],
+    }
+
+
+def verify_puzzle_files(filenames: list, workers: int = None, start: int = 0, stop: int = None, shard: int = 0,
+                        shards: int = 1, cooks: bool = False) -> Iterator[dict]:
+    """
+    Verifies the solution of every puzzle of the puzzle files on a pool of worker processes
+    :param filenames: The puzzle filenames
+    :param workers: The number of worker processes, default is the number of CPUs
+    :param start: The index of the first puzzle to verify in every file
+    :param stop: The index after the last puzzle to verify in every file, default is the end of the file
+    :param shard: The shard of every file to verify, to split the files across several runs
+    :param shards: The number of shards the files are split into
+    :param cooks: Whether to also find every winning first move of the puzzles
+    :return: An iterator of the results in the order the puzzles are verified
+    """
+    tasks = (
+        (filename, index, puzzle, cooks)
+        for filename in filenames
+        for index, puzzle in puzzleloader.iter_puzzles(filename, start=start, stop=stop, shard=shard, shards=shards)
+    )
+
+    if workers == 1:  # No need for a pool when there is a single worker
+        yield from map(verify_puzzle, tasks)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(verify_puzzle, tasks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify that the solutions of puzzle files are forced checkmates")
+    parser.add_argument('files', nargs='+', help="The puzzle files to verify")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="The number of worker processes, default is the number of CPUs")
+    parser.add_argument('--start', type=int, default=0, help="The index of the first puzzle of every file")
+    parser.add_argument('--stop', type=int, default=None, help="The index after the last puzzle of every file")
+    parser.add_argument('--shard', default='0/1',
+                        help="The shard to verify as INDEX/COUNT, every COUNT-th puzzle starting from INDEX")
+    parser.add_argument('--cooks', action='store_true',
+                        help="Also find every winning first move, to tell if the checkmate is unique")
+    parser.add_argument('--refuted-only', action='store_true',
+                        help="Only print the refuted solutions, and the puzzles that are not unique with --cooks")
+    args = parser.parse_args()
+    shard, shards = (int(number) for number in args.shard.split('/'))
+
+    start = time.perf_counter()
+    verified = unique = total = 0
+    for result in verify_puzzle_files(args.files, args.workers, args.start, args.stop, shard, shards, args.cooks):
+        total += 1
+        verified += result['status'] == 'verified'
+        unique += result.get('unique', False)
+        if args.refuted_only and result['status'] == 'verified' and result.get('unique', True):
+            continue
+        print(json.dumps(result), flush=True)  # Stream one JSON line per puzzle
+
+    print("Verified", verified, "of", total, "puzzles in", round(time.perf_counter() - start, 3), "seconds",
+          file=sys.stderr)
+    if args.cooks:
+        print("Unique checkmates:", unique, "of", total, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
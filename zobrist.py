@@ -0,0 +1,103 @@
+import chess
+import chess.polyglot
+
+# The Polyglot random numbers, so the keys are the same as chess.polyglot.zobrist_hash
+RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+CASTLING = 768
+EN_PASSANT = 772
+TURN = 780
+
+
+def piece_key(piece_type: chess.PieceType, color: chess.Color, square: chess.Square) -> int:
+    """
+    Gets the random number of a piece on a square
+    :param piece_type: The type of the piece
+    :param color: The color of the piece
+    :param square: The square of the piece
+    :return: The random number of the piece
+    """
+    return RANDOM[64 * ((piece_type - 1) * 2 + color) + square]
+
+
+def castling_key(board: chess.Board) -> int:
+    """
+    Gets the part of the key for the castling rights
+    :param board: The chess board
+    :return: The castling part of the key
+    """
+    key = 0
+    if board.has_kingside_castling_rights(chess.WHITE):
+        key ^= RANDOM[CASTLING]
+    if board.has_queenside_castling_rights(chess.WHITE):
+        key ^= RANDOM[CASTLING + 1]
+    if board.has_kingside_castling_rights(chess.BLACK):
+        key ^= RANDOM[CASTLING + 2]
+    if board.has_queenside_castling_rights(chess.BLACK):
+        key ^= RANDOM[CASTLING + 3]
+    return key
+
+
+def en_passant_key(board: chess.Board) -> int:
+    """
+    Gets the part of the key for the en passant square, only if a pawn is ready to capture on it
+    :param board: The chess board
+    :return: The en passant part of the key
+    """
+    if board.ep_square is None:
+        return 0
+    if board.turn == chess.WHITE:
+        mask = chess.shift_down(chess.BB_SQUARES[board.ep_square])
+    else:
+        mask = chess.shift_up(chess.BB_SQUARES[board.ep_square])
+    mask = chess.shift_left(mask) | chess.shift_right(mask)
+    if mask & board.pawns & board.occupied_co[board.turn]:
+        return RANDOM[EN_PASSANT + chess.square_file(board.ep_square)]
+    return 0
+
+
+def hash_board(board: chess.Board) -> int:
+    """
+    Calculates the 64-bit Zobrist key of a chess position from scratch
+    :param board: The chess board
+    :return: The Zobrist key of the position
+    """
+    key = castling_key(board) ^ en_passant_key(board)
+    if board.turn == chess.WHITE:
+        key ^= RANDOM[TURN]
+    for square, piece in board.piece_map().items():
+        key ^= piece_key(piece.piece_type, piece.color, square)
+    return key
+
+
+def push(board: chess.Board, key: int, move: chess.Move) -> int:
+    """
+    Makes a move on the board and incrementally updates the Zobrist key
+    :param board: The chess board, the move is pushed on it
+    :param key: The Zobrist key of the position before the move
+    :param move: The move to make
+    :return: The Zobrist key of the position after the move
+    """
+    turn = board.turn
+    key ^= castling_key(board) ^ en_passant_key(board) ^ RANDOM[TURN]
+
+    piece_type = board.piece_type_at(move.from_square)
+    key ^= piece_key(piece_type, turn, move.from_square)
+    key ^= piece_key(move.promotion or piece_type, turn, move.to_square)
+
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        if chess.square_file(move.to_square) > chess.square_file(move.from_square):  # King side
+            rook_from, rook_to = chess.square(7, rank), chess.square(5, rank)
+        else:  # Queen side
+            rook_from, rook_to = chess.square(0, rank), chess.square(3, rank)
+        key ^= piece_key(chess.ROOK, turn, rook_from) ^ piece_key(chess.ROOK, turn, rook_to)
+    elif board.is_en_passant(move):
+        captured_square = move.to_square - 8 if turn == chess.WHITE else move.to_square + 8
+        key ^= piece_key(chess.PAWN, not turn, captured_square)
+    else:
+        captured_type = board.piece_type_at(move.to_square)
+        if captured_type:
+            key ^= piece_key(captured_type, not turn, move.to_square)
+
+    board.push(move)
+    return key ^ castling_key(board) ^ en_passant_key(board)